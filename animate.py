@@ -0,0 +1,179 @@
+##################################################################
+# animate.py - Segment transition animations for OLED7Segment
+#   Animates a retained string (display_string (..., retained=True))
+#   to new text.  Every frame is a list of segment masks per
+#   character and only the segments that differ from the previous
+#   frame are cleared or filled (OLED7Segment.update_mask).
+#
+# Styles:
+#   "fade" - Old segments go off one per frame, then new ones come on
+#   "wipe" - Segments switch to the new character from top to bottom
+#   "roll" - Odometer: the old character moves up and out while the
+#            new one comes in from below (3 frames, 7 segments only,
+#            "wipe" is used for the 14/16 segment modes)
+#
+# Inputs (__init__ with default values):
+#   seven_segment - OLED7Segment drawing the text
+#   background=0 - Color for segments turned off
+# Methods:
+#   transition (xpos, ypos, chars, style="fade")
+#     Generator, yields the dirty box (x, y, width, height) after each
+#     frame is drawn (show () and sleep between frames).  Characters
+#     only change in place, if the character widths change the text
+#     is redrawn in one frame.  Afterwards the retained state holds
+#     chars, so display_string (..., retained=True) carries on.
+#
+# Typical use:
+# animator = SegmentAnimator (seven_segment)
+# seven_segment.display_string (0, 0, "12:59", retained=True)
+# for box in animator.transition (0, 0, "13:00", style="roll") :
+#     oled.show ()
+#     time.sleep (0.05)
+#
+#################################################################
+
+from oled7segment import SEG_TOP, SEG_UL, SEG_UR, SEG_MID, SEG_LL, SEG_LR, SEG_BOT
+
+SEVEN_BITS = SEG_TOP | SEG_UL | SEG_UR | SEG_MID | SEG_LL | SEG_LR | SEG_BOT
+
+class SegmentAnimator :
+    def __init__ (self, seven_segment, background=0) :
+        self.seven_segment = seven_segment
+        self.background = background
+
+    def transition (self, xpos, ypos, chars, style="fade") :
+        seven_segment = self.seven_segment
+        old = seven_segment.get_retained (xpos, ypos)
+        masks = seven_segment.segment_masks
+        slots = []
+        x_display = xpos
+        for char in chars :
+            mask = masks.get (char)
+            if mask == None :
+                char = "?"
+                mask = masks[char]
+            slots.append ((x_display, mask))
+            x_display += seven_segment.glyphs[char][0]
+        if old == None or not old[1] is seven_segment.segment_rects \
+                or not old[2] == (seven_segment.color, seven_segment.ghost_color) \
+                or not [slot[0] for slot in old[0]] == [slot[0] for slot in slots] :
+            yield seven_segment.display_string (xpos ,
+                                                ypos ,
+                                                chars ,
+                                                retained=True ,
+                                                background=self.background)
+            return
+        #---- mask sequence per character, all ending on the new mask
+        if style == "roll" and seven_segment.segments == 7 :
+            make_frames = self._roll_frames
+        elif style == "wipe" or style == "roll" :
+            make_frames = self._wipe_frames
+        else :
+            make_frames = self._fade_frames
+        sequences = []
+        frame_count = 0
+        for index in range (len (slots)) :
+            old_mask = old[0][index][1]
+            new_mask = slots[index][1]
+            frames = make_frames (old_mask, new_mask) if not old_mask == new_mask else []
+            sequences.append ((slots[index][0], old_mask, frames))
+            frame_count = max (frame_count, len (frames))
+        current = [sequence[1] for sequence in sequences]
+        for frame in range (frame_count) :
+            box = None
+            for index in range (len (sequences)) :
+                x_slot, old_mask, frames = sequences[index]
+                if frame >= len (frames) :
+                    continue
+                changed = seven_segment.update_mask (x_slot ,
+                                                     ypos ,
+                                                     current[index] ,
+                                                     frames[frame] ,
+                                                     self.background)
+                current[index] = frames[frame]
+                box = _union (box, changed)
+            yield box
+        #---- the last frame drew chars, only record them
+        seven_segment.set_retained (xpos, ypos, slots)
+
+    #---------------------------------------------------------------------------------
+    def _fade_frames (self, old_mask, new_mask) :
+        bits = self.seven_segment.segment_bits
+        frames = []
+        mask = old_mask
+        for bit in bits :
+            if mask & bit and not new_mask & bit :
+                mask &= ~bit
+                frames.append (mask)
+        for bit in bits :
+            if new_mask & bit and not mask & bit :
+                mask |= bit
+                frames.append (mask)
+        return frames
+
+    def _wipe_frames (self, old_mask, new_mask) :
+        # Rows by the top of each changed segment's rectangles
+        tops = {}
+        for bit, parts in self.seven_segment.segment_rects.items () :
+            tops[bit] = min ([part[1] for part in parts])
+        changed = old_mask ^ new_mask
+        rows = sorted (set ([top for bit, top in tops.items () if changed & bit]))
+        frames = []
+        for row in rows :
+            below = 0
+            for bit, top in tops.items () :
+                if top > row :
+                    below |= bit
+            frames.append ((old_mask & below) | (new_mask & ~below))
+        return frames
+
+    def _roll_frames (self, old_mask, new_mask) :
+        # Segment rows TOP, UL/UR, MID, LL/LR, BOT of the old character,
+        # an empty gap, then the new character, seen through a 5 row
+        # window moving down 2 rows per frame.
+        rows = _rows (old_mask) + [0] + _rows (new_mask)
+        frames = []
+        for start in (2, 4) :
+            frames.append (_from_rows (rows[start:start + 5])
+                           | (old_mask & ~SEVEN_BITS))
+        frames.append (new_mask)
+        return frames
+
+# end SegmentAnimator #
+
+def _rows (mask) :
+    # horizontal rows are 1/0, vertical rows 1 = left, 2 = right
+    return [1 if mask & SEG_TOP else 0 ,
+            (1 if mask & SEG_UL else 0) | (2 if mask & SEG_UR else 0) ,
+            1 if mask & SEG_MID else 0 ,
+            (1 if mask & SEG_LL else 0) | (2 if mask & SEG_LR else 0) ,
+            1 if mask & SEG_BOT else 0]
+
+def _from_rows (rows) :
+    mask = 0
+    if rows[0] :
+        mask |= SEG_TOP
+    if rows[1] & 1 :
+        mask |= SEG_UL
+    if rows[1] & 2 :
+        mask |= SEG_UR
+    if rows[2] :
+        mask |= SEG_MID
+    if rows[3] & 1 :
+        mask |= SEG_LL
+    if rows[3] & 2 :
+        mask |= SEG_LR
+    if rows[4] :
+        mask |= SEG_BOT
+    return mask
+
+def _union (box, other) :
+    if box == None :
+        return other
+    if other == None :
+        return box
+    x_0 = min (box[0], other[0])
+    y_0 = min (box[1], other[1])
+    x_1 = max (box[0] + box[2], other[0] + other[2])
+    y_1 = max (box[1] + box[3], other[1] + other[3])
+    return (x_0, y_0, x_1 - x_0, y_1 - y_0)
@@ -0,0 +1,187 @@
+##################################################################
+# benchmark.py - Glyph rendering benchmark (host side, CPython)
+#   Times display_character for every character in SEGMENT_MASKS
+#   and display_string for the whole set, at digit_size "S", "M"
+#   and "L", bold off and on, against several backends:
+#     rects      - OLED7Segment straight into a counting fill_rect
+#                  (engine overhead only)
+#     gfx_pixel  - gfx.GFX with only a pixel function (slow path)
+#     monocanvas - gfx.GFX over monocanvas.MonoCanvas (native rects)
+#     numpy      - gfx.GFX over npcanvas.NumpyCanvas (if installed)
+#   Reports ns/glyph, backend calls/glyph and pixels touched/glyph
+#   and can save them as JSON to compare commits.
+#
+# Usage:
+#   python benchmark.py [--repeat N] [--backend NAME ...]
+#                       [--output results.json] [--compare old.json]
+#
+#################################################################
+
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import gfx
+from monocanvas import MonoCanvas
+from oled7segment import OLED7Segment, SEGMENT_MASKS
+
+WIDTH = 1024            # wide enough that no glyph of the string is clipped
+HEIGHT = 64
+SIZES = ("S", "M", "L")
+
+class PixelCounter :
+    # Only a pixel function, so GFX falls back to its per pixel paths
+    def __init__ (self, target=None) :
+        self.target = target
+        self.calls = 0
+        self.pixels = 0
+    def reset (self) :
+        self.calls = 0
+        self.pixels = 0
+    def pixel (self, x, y, *args) :
+        self.calls += 1
+        self.pixels += 1
+        if not self.target == None :
+            self.target.pixel (x, y, *args)
+
+class RectCounter (PixelCounter) :
+    # Counts (and forwards) native line/rectangle calls
+    def hline (self, x, y, width, *args) :
+        self.calls += 1
+        self.pixels += width
+        if not self.target == None :
+            self.target.hline (x, y, width, *args)
+    def vline (self, x, y, height, *args) :
+        self.calls += 1
+        self.pixels += height
+        if not self.target == None :
+            self.target.vline (x, y, height, *args)
+    def fill_rect (self, x, y, width, height, *args) :
+        self.calls += 1
+        self.pixels += width * height
+        if not self.target == None :
+            self.target.fill_rect (x, y, width, height, *args)
+
+def make_backends () :
+    backends = {}
+    counter = RectCounter ()
+    backends["rects"] = (counter, counter)
+    counter = PixelCounter ()
+    backends["gfx_pixel"] = (gfx.GFX (WIDTH, HEIGHT, counter.pixel), counter)
+    counter = RectCounter (MonoCanvas (WIDTH, HEIGHT))
+    backends["monocanvas"] = (gfx.GFX (WIDTH, HEIGHT, counter.pixel), counter)
+    try :
+        from npcanvas import NumpyCanvas
+        counter = RectCounter (NumpyCanvas (WIDTH, HEIGHT))
+        backends["numpy"] = (gfx.GFX (WIDTH, HEIGHT, counter.pixel), counter)
+    except ImportError :
+        pass
+    return backends
+
+def time_call (function, repeat) :
+    best = None
+    for _ in range (3) :
+        start = time.perf_counter_ns ()
+        for _ in range (repeat) :
+            function ()
+        elapsed = time.perf_counter_ns () - start
+        if best == None or elapsed < best :
+            best = elapsed
+    return best / repeat
+
+def measure (counter, function, glyphs, repeat) :
+    counter.reset ()
+    function ()
+    calls = counter.calls / glyphs
+    pixels = counter.pixels / glyphs
+    return {
+        "ns_per_glyph" : round (time_call (function, repeat) / glyphs, 1) ,
+        "calls_per_glyph" : calls ,
+        "pixels_per_glyph" : pixels
+        }
+
+def run (backend_names=None, repeat=200) :
+    chars = "".join (sorted (SEGMENT_MASKS))
+    results = []
+    for name, (display, counter) in make_backends ().items () :
+        if backend_names and not name in backend_names :
+            continue
+        seven_segment = OLED7Segment (display)
+        for size in SIZES :
+            for bold in (False, True) :
+                seven_segment.set_parameters (digit_size=size, bold=bold)
+                case = {"backend" : name, "size" : size, "bold" : bold}
+                for char in chars :
+                    result = dict (case, char=char)
+                    result.update (measure (counter ,
+                            lambda : seven_segment.display_character (0, 0, char) ,
+                            1 ,
+                            repeat))
+                    results.append (result)
+                result = dict (case, char="<string>")
+                result.update (measure (counter ,
+                        lambda : seven_segment.display_string (0, 0, chars) ,
+                        len (chars) ,
+                        max (1, repeat // len (chars))))
+                results.append (result)
+    return results
+
+def git_commit () :
+    try :
+        return subprocess.check_output (["git", "rev-parse", "--short", "HEAD"],
+                                        stderr=subprocess.DEVNULL).decode ().strip ()
+    except (OSError, subprocess.CalledProcessError) :
+        return None
+
+def main () :
+    parser = argparse.ArgumentParser (description="OLED7Segment glyph benchmark")
+    parser.add_argument ("--repeat", type=int, default=200,
+                         help="draws per timing run (default 200)")
+    parser.add_argument ("--backend", action="append",
+                         help="only run this backend (repeatable)")
+    parser.add_argument ("--output", help="write results as JSON")
+    parser.add_argument ("--compare",
+                         help="JSON from an earlier run, show ns/glyph ratio")
+    args = parser.parse_args ()
+    results = run (args.backend, args.repeat)
+    previous = {}
+    if args.compare :
+        with open (args.compare) as old :
+            for result in json.load (old)["results"] :
+                previous[(result["backend"] ,
+                          result["size"] ,
+                          result["bold"] ,
+                          result["char"])] = result["ns_per_glyph"]
+    print ("%-10s %-4s %-5s %12s %10s %10s %8s" % ("backend", "size", "bold",
+                                            "ns/glyph", "calls", "pixels",
+                                            "vs old"))
+    for result in results :
+        if result["char"] == "<string>" :
+            old_ns = previous.get ((result["backend"] ,
+                                    result["size"] ,
+                                    result["bold"] ,
+                                    result["char"]))
+            ratio = "" if old_ns == None else \
+                        "%.2fx" % (result["ns_per_glyph"] / old_ns)
+            print ("%-10s %-4s %-5s %12.1f %10.2f %10.1f %8s" % (result["backend"],
+                                                    result["size"],
+                                                    result["bold"],
+                                                    result["ns_per_glyph"],
+                                                    result["calls_per_glyph"],
+                                                    result["pixels_per_glyph"],
+                                                    ratio))
+    if args.output :
+        report = {
+            "commit" : git_commit () ,
+            "python" : platform.python_version () ,
+            "platform" : platform.platform () ,
+            "repeat" : args.repeat ,
+            "results" : results
+            }
+        with open (args.output, "w") as output :
+            json.dump (report, output, indent=1)
+
+if __name__ == "__main__" :
+    main ()
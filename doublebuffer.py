@@ -0,0 +1,91 @@
+##################################################################
+# doublebuffer.py - Render the next frame while the last one is sent
+#   Drawing goes into a back buffer (a MonoCanvas, same page layout
+#   as the SSD1306).  swap () copies it into the display's buffer
+#   and a worker thread calls the display's show (), so the next
+#   frame can be drawn during the (~25 ms at 400 kHz I2C) transfer.
+#   Uses threading on CPython and _thread on MicroPython boards that
+#   have it, otherwise swap () simply shows the frame itself.
+#   The back buffer keeps its content after swap (), so retained
+#   mode drawing keeps working.
+#
+# Inputs (__init__ with default values):
+#   display - Driver with a page layout buffer and show () (ssd1306)
+#   width=None, height=None - Default to display.width/height
+# Attributes:
+#   canvas - The back buffer to draw into, for example
+#            gfx.GFX (width, height, double.canvas.pixel)
+#   threaded - True if flushing happens in the background
+# Methods:
+#   swap () - Wait for the previous flush, hand this frame over
+#   wait () - Wait until the last frame has been sent
+#   close () - Stop the worker thread, swap () then shows the frame
+#              itself
+#
+#################################################################
+
+from monocanvas import MonoCanvas
+
+try :
+    import threading
+    _allocate_lock = threading.Lock
+    def _start_thread (function) :
+        threading.Thread (target=function, daemon=True).start ()
+except ImportError :
+    try :
+        import _thread
+        _allocate_lock = _thread.allocate_lock
+        def _start_thread (function) :
+            _thread.start_new_thread (function, ())
+    except ImportError :
+        _allocate_lock = None
+
+class DoubleBuffer :
+    def __init__ (self, display, width=None, height=None) :
+        if width == None :
+            width = display.width
+        if height == None :
+            height = display.height
+        self.display = display
+        self.canvas = MonoCanvas (width, height)
+        self.running = False
+        self.threaded = not _allocate_lock == None
+        if self.threaded :
+            self.idle = _allocate_lock ()       # held while a flush runs
+            self.ready = _allocate_lock ()      # released when a frame waits
+            self.ready.acquire ()
+            self.running = True
+            _start_thread (self._worker)
+
+    def _worker (self) :
+        while True :
+            self.ready.acquire ()
+            if not self.running :
+                self.idle.release ()
+                return
+            self.display.show ()
+            self.idle.release ()
+
+    def swap (self) :
+        if not self.running :       # no thread, or closed
+            self.display.buffer[:] = self.canvas.buffer
+            self.display.show ()
+            return
+        self.idle.acquire ()
+        self.display.buffer[:] = self.canvas.buffer
+        self.ready.release ()
+
+    def wait (self) :
+        if self.threaded :
+            self.idle.acquire ()
+            self.idle.release ()
+
+    def close (self) :
+        if self.running :
+            self.idle.acquire ()
+            self.running = False
+            self.ready.release ()
+            self.idle.acquire ()
+            self.idle.release ()
+
+# end DoubleBuffer #
@@ -0,0 +1,117 @@
+##################################################################
+# fontcompile.py - Precompile OLED7Segment geometry into a module
+#   Host side tool.  Runs set_parameters once and writes the segment
+#   rectangles and the glyphs (lit and ghost_color rectangles) as
+#   constant tuples, bytes and a character string, so the device
+#   only imports data (OLED7Segment (..., font=module) or load_font
+#   (module)) and skips the geometry setup.  No dict literals: those
+#   are built on the heap at import even when frozen, constant
+#   tuples/bytes/strings of a frozen module stay in flash.
+#
+# Usage:
+#   python fontcompile.py [--digit-size S|M|L] [--v-segment-length N]
+#                         [--h-segment-length N] [--segment-width N]
+#                         [--spacing N] [--bold] [--segments 7|14|16]
+#                         [-o font_s.py]
+#
+# Typical device use:
+# import font_m
+# seven_segment = OLED7Segment (graphic, font=font_m)
+#
+#################################################################
+
+import argparse
+
+from oled7segment import OLED7Segment
+
+def compile_font (**parameters) :
+    # Ghost rectangles are compiled too, so load_font needs no geometry
+    # with or without ghost_color
+    seven_segment = OLED7Segment (None)
+    seven_segment.set_parameters (ghost_color=1, **parameters)
+    settings = ", ".join ("%s=%r" % (name, parameters[name])
+                            for name in sorted (parameters))
+    bits = seven_segment.segment_bits
+    #---- one entry per distinct glyph (lowercase letters share the
+    #     uppercase ones), characters index into them
+    chars = "".join (sorted (seven_segment.glyphs))
+    glyphs = []
+    glyph_index = []
+    for char in chars :
+        glyph = seven_segment.glyphs[char]
+        if not glyph in glyphs :
+            glyphs.append (glyph)
+        glyph_index.append (glyphs.index (glyph))
+    if len (glyphs) > 256 or max (glyph[0] for glyph in glyphs) > 255 :
+        raise ValueError ("too many glyphs or glyphs too wide for a font module")
+    lines = [
+        "# OLED7Segment font generated by fontcompile.py, do not edit" ,
+        "# set_parameters (%s)" % settings ,
+        "# Constant tuples, bytes and strings only: frozen, they stay in flash." ,
+        "" ,
+        "V_SEGMENT_LEN = %d" % seven_segment.v_segment_len ,
+        "H_SEGMENT_LEN = %d" % seven_segment.h_segment_len ,
+        "SEGMENT_WID = %d" % seven_segment.segment_wid ,
+        "SPACING = %d" % seven_segment.spacing ,
+        "BOLD = %r" % bool (seven_segment.bold) ,
+        "CHAR_WID = %d" % seven_segment.char_wid ,
+        "CHAR_HEIGHT = %d" % seven_segment.char_height ,
+        "SIGN_SEG_LEN = %d" % seven_segment.sign_seg_len ,
+        "SEGMENTS = %d" % seven_segment.segments ,
+        "" ,
+        "# segment bits, SEGMENT_RECTS and SEGMENT_OVERLAPS in the same order" ,
+        "SEGMENT_BITS = %r" % (tuple (bits) ,) ,
+        "" ,
+        "# ((dx, dy, width, height), ...) per segment bit" ,
+        "SEGMENT_RECTS = ("]
+    lines += _items ([seven_segment.segment_rects[bit] for bit in bits])
+    lines += ["    )" ,
+              "" ,
+              "# bits sharing pixels with each segment bit" ,
+              "SEGMENT_OVERLAPS = %r" % (tuple (seven_segment.segment_overlaps[bit]
+                                                for bit in bits) ,) ,
+              "" ,
+              "# GLYPH_INDEX[i] is the glyph of CHARS[i]" ,
+              "CHARS = %r" % chars ,
+              "GLYPH_INDEX = %r" % bytes (glyph_index) ,
+              "" ,
+              "# per glyph: advance, lit rectangles, ghost_color rectangles" ,
+              "ADVANCES = %r" % bytes (glyph[0] for glyph in glyphs) ,
+              "GLYPH_RECTS = ("]
+    lines += _items ([glyph[1] for glyph in glyphs])
+    lines += ["    )" ,
+              "GHOST_RECTS = ("]
+    lines += _items ([glyph[2] for glyph in glyphs])
+    lines += ["    )", ""]
+    return "\n".join (lines)
+
+def _items (values) :
+    # Tuple body lines, one value per line
+    return ["    %r ," % (value ,) for value in values]
+
+def main () :
+    parser = argparse.ArgumentParser (description="Precompile OLED7Segment geometry")
+    parser.add_argument ("--digit-size", choices=("S", "M", "L"), default="S")
+    parser.add_argument ("--v-segment-length", type=int)
+    parser.add_argument ("--h-segment-length", type=int)
+    parser.add_argument ("--segment-width", type=int)
+    parser.add_argument ("--spacing", type=int)
+    parser.add_argument ("--bold", action="store_true")
+    parser.add_argument ("--segments", type=int, choices=(7, 14, 16), default=7)
+    parser.add_argument ("-o", "--output", help="module to write (default stdout)")
+    args = parser.parse_args ()
+    parameters = {"digit_size" : args.digit_size ,
+                  "bold" : args.bold ,
+                  "segments" : args.segments}
+    for name in ("v_segment_length", "h_segment_length", "segment_width", "spacing") :
+        if not getattr (args, name) == None :
+            parameters[name] = getattr (args, name)
+    source = compile_font (**parameters)
+    if args.output :
+        with open (args.output, "w", encoding="utf-8") as output :
+            output.write (source)
+    else :
+        print (source, end="")
+
+if __name__ == "__main__" :
+    main ()
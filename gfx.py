@@ -3,9 +3,16 @@
 # Author: Tony DiCola (original GFX author Phil Burgess)
 # License: MIT License (https://opensource.org/licenses/MIT)
 
+try:
+    import framebuf
+except ImportError:
+    framebuf = None     # CPython, no native blit
+
 class GFX:
 
-    def __init__(self, width, height, pixel, hline=None, vline=None):
+    def __init__(self, width, height, pixel, hline=None, vline=None,
+                 bitmap=None, fill_rect=None, rect=None, fill=None,
+                 native=None, blit=None):
         # Create an instance of the GFX drawing class.  You must pass in the
         # following parameters:
         #  - width = The width of the drawing area in pixels.
@@ -21,43 +28,181 @@ class GFX:
         #  - vline = A function to quickly draw a vertical line on the display.
         #            This should take at least an x, y, and height paraemter and
         #            any number of optional color or other parameters.
+        #  - bitmap = A function to quickly draw a packed 1 bit per pixel
+        #             bitmap (row major, MSB first like framebuf MONO_HLSB).
+        #             This should take x, y, width, height and buffer
+        #             parameters and then the color or other parameters.
+        #  - fill_rect, rect = Functions to draw a filled / outlined rectangle
+        #            taking x, y, width, height and then the color or other
+        #            parameters (same as the methods below).
+        #  - fill = A function to fill the whole display taking the color.
+        #  - blit = A framebuf.FrameBuffer blit function (fbuf, x, y, key,
+        #            palette).  Used for bitmap when no bitmap function is
+        #            given, the packed bitmap is wrapped in a MONO_HLSB
+        #            FrameBuffer and blitted in one native call.
+        #  - native = An object whose fill_rect, rect, fill, hline, vline and
+        #            blit methods are used for any of the above not given.  This
+        #            defaults to the object pixel belongs to, so passing the
+        #            bound oled.pixel of a MicroPython framebuf based driver
+        #            (like ssd1306) draws whole rectangles and lines natively.
+        #  All drawing is clipped to the clip rectangle (see set_clip, the
+        #  whole display by default) once per call, so the functions above
+        #  only ever receive the visible part.
         self.width = width
         self.height = height
         self._pixel = pixel
+        if native is None:
+            native = getattr(pixel, '__self__', None)
+        if native is not None:
+            if hline is None:
+                hline = getattr(native, 'hline', None)
+            if vline is None:
+                vline = getattr(native, 'vline', None)
+            if fill_rect is None:
+                fill_rect = getattr(native, 'fill_rect', None)
+            if rect is None:
+                rect = getattr(native, 'rect', None)
+            if fill is None:
+                fill = getattr(native, 'fill', None)
+            if blit is None:
+                blit = getattr(native, 'blit', None)
+        # Native rectangle and fill functions replace the line based
+        # versions below.
+        self._fill_rect = fill_rect
+        self._rect = rect
+        self._fill = fill
+        self._blit = blit
+        # True when bitmap goes through the native blit (callers may
+        # then pass bitmap a FrameBuffer they keep, see bitmap).
+        self.native_blit = bitmap is None and blit is not None \
+            and framebuf is not None
+        if self.native_blit:
+            # Source pixel 0 -> palette pixel 0 (the key), 1 -> the color
+            self._palette = framebuf.FrameBuffer(bytearray(4), 2, 1, framebuf.RGB565)
+            bitmap = self._blit_bitmap
+        self._bitmap = bitmap
+        # True when bitmap draws natively instead of one hline per run
+        # (OLED7Segment only uses its glyph cache then).
+        self.native_bitmap = bitmap is not None
         # Default to slow horizontal & vertical line implementations if no
         # faster versions are provided.
         if hline is None:
-            self.hline = self._slow_hline
+            self._hline = self._slow_hline
         else:
-            self.hline = hline
+            self._hline = hline
         if vline is None:
-            self.vline = self._slow_vline
+            self._vline = self._slow_vline
         else:
-            self.vline = vline
+            self._vline = vline
+        self.reset_clip()
+
+    def set_clip(self, x0, y0, width, height):
+        # Only draw inside this rectangle (limited to the display) until
+        # reset_clip is called.  Useful for scrolling or partly off screen
+        # text: everything outside is dropped before reaching the display.
+        self.clip_x0 = max(x0, 0)
+        self.clip_y0 = max(y0, 0)
+        self.clip_x1 = max(min(x0 + width, self.width), self.clip_x0)
+        self.clip_y1 = max(min(y0 + height, self.height), self.clip_y0)
+
+    def reset_clip(self):
+        self.set_clip(0, 0, self.width, self.height)
+
+    def _clipped_all(self):
+        return self.clip_x0 > 0 or self.clip_y0 > 0 \
+            or self.clip_x1 < self.width or self.clip_y1 < self.height
+
+    def pixel(self, x0, y0, *args, **kwargs):
+        # Draw a single pixel if it is inside the clip rectangle.
+        if self.clip_x0 <= x0 < self.clip_x1 and self.clip_y0 <= y0 < self.clip_y1:
+            self._pixel(x0, y0, *args, **kwargs)
+
+    def hline(self, x0, y0, width, *args, **kwargs):
+        # Horizontal line, clipped.
+        if y0 < self.clip_y0 or y0 >= self.clip_y1:
+            return
+        x1 = min(x0 + width, self.clip_x1)
+        if x0 < self.clip_x0:
+            x0 = self.clip_x0
+        if x0 < x1:
+            self._hline(x0, y0, x1 - x0, *args, **kwargs)
+
+    def vline(self, x0, y0, height, *args, **kwargs):
+        # Vertical line, clipped.
+        if x0 < self.clip_x0 or x0 >= self.clip_x1:
+            return
+        y1 = min(y0 + height, self.clip_y1)
+        if y0 < self.clip_y0:
+            y0 = self.clip_y0
+        if y0 < y1:
+            self._vline(x0, y0, y1 - y0, *args, **kwargs)
 
     def _slow_hline(self, x0, y0, width, *args, **kwargs):
         # Slow implementation of a horizontal line using pixel drawing.
         # This is used as the default horizontal line if no faster override
-        # is provided.
-        if y0 < 0 or y0 > self.height or x0 < -width or x0 > self.width:
-            return
+        # is provided.  Called with already clipped coordinates.
         for i in range(width):
             self._pixel(x0+i, y0, *args, **kwargs)
 
     def _slow_vline(self, x0, y0, height, *args, **kwargs):
         # Slow implementation of a vertical line using pixel drawing.
         # This is used as the default vertical line if no faster override
-        # is provided.
-        if y0 < -height or y0 > self.height or x0 < 0 or x0 > self.width:
-            return
+        # is provided.  Called with already clipped coordinates.
         for i in range(height):
             self._pixel(x0, y0+i, *args, **kwargs)
 
+    def bitmap(self, x0, y0, width, height, buf, *args, fbuf=None, **kwargs):
+        # Draw a packed 1 bit per pixel bitmap (row major, MSB first), set
+        # bits in the given color, clear bits left untouched.  fbuf is an
+        # optional framebuf.FrameBuffer (MONO_HLSB) over buf kept by the
+        # caller, so the native blit does not wrap buf on every call.
+        if x0 >= self.clip_x1 or y0 >= self.clip_y1 \
+                or x0 + width <= self.clip_x0 or y0 + height <= self.clip_y0:
+            return
+        if self._bitmap is not None and x0 >= self.clip_x0 \
+                and y0 >= self.clip_y0 and x0 + width <= self.clip_x1 \
+                and y0 + height <= self.clip_y1:
+            if self.native_blit:
+                self._blit_bitmap(x0, y0, width, height, buf, *args, fbuf=fbuf)
+            else:
+                self._bitmap(x0, y0, width, height, buf, *args, **kwargs)
+            return
+        # One horizontal line per run of set bits.
+        stride = (width + 7) // 8
+        for row in range(max(0, self.clip_y0 - y0),
+                         min(height, self.clip_y1 - y0)):
+            base = row * stride
+            start = -1
+            for col in range(width + 1):
+                if col < width and buf[base + (col >> 3)] & (0x80 >> (col & 7)):
+                    if start < 0:
+                        start = col
+                elif start >= 0:
+                    self.hline(x0+start, y0+row, col-start, *args, **kwargs)
+                    start = -1
+
+    def _blit_bitmap(self, x0, y0, width, height, buf, color=1, fbuf=None):
+        # bitmap through the native framebuf blit, called unclipped
+        # (bitmap only uses it when the whole bitmap is visible).  blit
+        # compares the key after the palette lookup, so the key must
+        # differ from color or color 0 would draw nothing.
+        key = 1 if color == 0 else 0
+        self._palette.pixel(0, 0, key)
+        self._palette.pixel(1, 0, color)
+        if fbuf is None:
+            fbuf = framebuf.FrameBuffer(buf, width, height, framebuf.MONO_HLSB)
+        self._blit(fbuf, x0, y0, key, self._palette)
+
     def rect(self, x0, y0, width, height, *args, **kwargs):
         # Rectangle drawing function.  Will draw a single pixel wide rectangle
         # starting in the upper left x0, y0 position and width, height pixels in
         # size.
-        if y0 < -height or y0 > self.height or x0 < -width or x0 > self.width:
+        if width <= 0 or height <= 0:
+            return
+        if self._rect is not None and x0 >= self.clip_x0 \
+                and y0 >= self.clip_y0 and x0 + width <= self.clip_x1 \
+                and y0 + height <= self.clip_y1:
+            self._rect(x0, y0, width, height, *args, **kwargs)
             return
         self.hline(x0, y0, width, *args, **kwargs)
         self.hline(x0, y0+height-1, width, *args, **kwargs)
@@ -67,15 +212,34 @@ class GFX:
     def fill_rect(self, x0, y0, width, height, *args, **kwargs):
         # Filled rectangle drawing function.  Will draw a single pixel wide
         # rectangle starting in the upper left x0, y0 position and width, height
-        # pixels in size.
-        if y0 < -height or y0 > self.height or x0 < -width or x0 > self.width:
+        # pixels in size.  The rectangle is clipped once, then filled natively
+        # or one vertical line per column.
+        x1 = min(x0 + width, self.clip_x1)
+        y1 = min(y0 + height, self.clip_y1)
+        if x0 < self.clip_x0:
+            x0 = self.clip_x0
+        if y0 < self.clip_y0:
+            y0 = self.clip_y0
+        if x0 >= x1 or y0 >= y1:
+            return
+        if self._fill_rect is not None:
+            self._fill_rect(x0, y0, x1 - x0, y1 - y0, *args, **kwargs)
             return
-        for i in range(x0, x0+width):
-            self.vline(i, y0, height, *args, **kwargs)
+        for i in range(x0, x1):
+            self._vline(i, y0, y1 - y0, *args, **kwargs)
+
+    def fill(self, *args, **kwargs):
+        # Fill the whole display (the clip rectangle if one is set).
+        if self._fill is not None and not self._clipped_all():
+            self._fill(*args, **kwargs)
+        else:
+            self.fill_rect(0, 0, self.width, self.height, *args, **kwargs)
 
     def line(self, x0, y0, x1, y1, *args, **kwargs):
         # Line drawing function.  Will draw a single pixel wide line starting at
-        # x0, y0 and ending at x1, y1.
+        # x0, y0 and ending at x1, y1.  Bresenham's algorithm, but every run
+        # of pixels on the same row (column for steep lines) is drawn as one
+        # clipped horizontal (vertical) line instead of pixel by pixel.
         steep = abs(y1 - y0) > abs(x1 - x0)
         if steep:
             x0, y0 = y0, x0
@@ -91,45 +255,72 @@ class GFX:
             ystep = 1
         else:
             ystep = -1
+        start = x0
         while x0 <= x1:
-            if steep:
-                self._pixel(y0, x0, *args, **kwargs)
-            else:
-                self._pixel(x0, y0, *args, **kwargs)
             err -= dy
             if err < 0:
+                if steep:
+                    self.vline(y0, start, x0 - start + 1, *args, **kwargs)
+                else:
+                    self.hline(start, y0, x0 - start + 1, *args, **kwargs)
+                start = x0 + 1
                 y0 += ystep
                 err += dx
             x0 += 1
+        if start <= x1:
+            if steep:
+                self.vline(y0, start, x1 - start + 1, *args, **kwargs)
+            else:
+                self.hline(start, y0, x1 - start + 1, *args, **kwargs)
+
+    def polyline(self, points, *args, **kwargs):
+        # Draw lines joining a sequence of (x, y) points.
+        for i in range(1, len(points)):
+            self.line(points[i-1][0], points[i-1][1],
+                      points[i][0], points[i][1], *args, **kwargs)
+
+    def polygon(self, points, *args, **kwargs):
+        # Draw the outline of the polygon through a sequence of (x, y)
+        # points, the last point is joined back to the first.
+        self.polyline(points, *args, **kwargs)
+        if len(points) > 2:
+            self.line(points[-1][0], points[-1][1],
+                      points[0][0], points[0][1], *args, **kwargs)
 
     def circle(self, x0, y0, radius, *args, **kwargs):
         # Circle drawing function.  Will draw a single pixel wide circle with
-        # center at x0, y0 and the specified radius.
+        # center at x0, y0 and the specified radius.  Midpoint algorithm over
+        # one octant; the points that share a row are mirrored into the other
+        # octants as 4 horizontal and 4 vertical lines.
         f = 1 - radius
         ddF_x = 1
         ddF_y = -2 * radius
         x = 0
         y = radius
-        self._pixel(x0, y0 + radius, *args, **kwargs)
-        self._pixel(x0, y0 - radius, *args, **kwargs)
-        self._pixel(x0 + radius, y0, *args, **kwargs)
-        self._pixel(x0 - radius, y0, *args, **kwargs)
+        start = 0
         while x < y:
             if f >= 0:
+                self._circle_spans(x0, y0, start, x, y, *args, **kwargs)
+                start = x + 1
                 y -= 1
                 ddF_y += 2
                 f += ddF_y
             x += 1
             ddF_x += 2
             f += ddF_x
-            self._pixel(x0 + x, y0 + y, *args, **kwargs)
-            self._pixel(x0 - x, y0 + y, *args, **kwargs)
-            self._pixel(x0 + x, y0 - y, *args, **kwargs)
-            self._pixel(x0 - x, y0 - y, *args, **kwargs)
-            self._pixel(x0 + y, y0 + x, *args, **kwargs)
-            self._pixel(x0 - y, y0 + x, *args, **kwargs)
-            self._pixel(x0 + y, y0 - x, *args, **kwargs)
-            self._pixel(x0 - y, y0 - x, *args, **kwargs)
+        self._circle_spans(x0, y0, start, x, y, *args, **kwargs)
+
+    def _circle_spans(self, x0, y0, a, b, y, *args, **kwargs):
+        # Octant points (a..b, y) of a circle around x0, y0 in all octants.
+        n = b - a + 1
+        self.hline(x0 + a, y0 + y, n, *args, **kwargs)
+        self.hline(x0 - b, y0 + y, n, *args, **kwargs)
+        self.hline(x0 + a, y0 - y, n, *args, **kwargs)
+        self.hline(x0 - b, y0 - y, n, *args, **kwargs)
+        self.vline(x0 + y, y0 + a, n, *args, **kwargs)
+        self.vline(x0 - y, y0 + a, n, *args, **kwargs)
+        self.vline(x0 + y, y0 - b, n, *args, **kwargs)
+        self.vline(x0 - y, y0 - b, n, *args, **kwargs)
 
     def fill_circle(self, x0, y0, radius, *args, **kwargs):
         # Filled circle drawing function.  Will draw a filled circule with
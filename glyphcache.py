@@ -0,0 +1,89 @@
+##################################################################
+# glyphcache.py - Bounded LRU cache of pre-rasterized glyph bitmaps
+#   Used by OLED7Segment (glyph_cache=GlyphCache (...)) so a
+#   character is rasterized once per parameter set and then blitted
+#   with one native FrameBuffer.blit (directly or through GFX.bitmap)
+#   instead of several fill_rect calls.
+#
+# Inputs (__init__ with default values):
+#   max_bytes=2048 - Bitmap byte budget, least recently used
+#                    bitmaps are evicted when it is exceeded
+# Methods:
+#   get (key) - Cached value or None (counts a hit or a miss)
+#   put (key, value, size) - Store value costing size bytes
+#   clear () - Drop all entries (statistics are kept)
+#   stats () - dict of hits, misses, evictions, entries, bytes
+# Functions:
+#   rasterize (rects, width, height)
+#     Packs (x, y, w, h) rectangles into a 1 bit per pixel, row
+#     major, MSB first (framebuf MONO_HLSB) bytearray
+#
+#################################################################
+
+class GlyphCache :
+    def __init__ (self, max_bytes=2048) :
+        self.max_bytes = max_bytes
+        self.entries = {}           # key -> [last use, value, size]
+        self.bytes_used = 0
+        self.tick = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get (self, key) :
+        entry = self.entries.get (key)
+        if entry == None :
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.tick += 1
+        entry[0] = self.tick
+        return entry[1]
+
+    def put (self, key, value, size) :
+        if size > self.max_bytes :
+            return                  # would evict everything, don't cache
+        old = self.entries.pop (key, None)
+        if not old == None :
+            self.bytes_used -= old[2]
+        while self.bytes_used + size > self.max_bytes :
+            self._evict ()
+        self.tick += 1
+        self.entries[key] = [self.tick, value, size]
+        self.bytes_used += size
+
+    def _evict (self) :
+        oldest_key = None
+        oldest_tick = None
+        for key, entry in self.entries.items () :
+            if oldest_tick == None or entry[0] < oldest_tick :
+                oldest_key = key
+                oldest_tick = entry[0]
+        self.bytes_used -= self.entries.pop (oldest_key)[2]
+        self.evictions += 1
+
+    def clear (self) :
+        self.entries = {}
+        self.bytes_used = 0
+
+    def stats (self) :
+        return {
+            "hits" : self.hits ,
+            "misses" : self.misses ,
+            "evictions" : self.evictions ,
+            "entries" : len (self.entries) ,
+            "bytes" : self.bytes_used
+            }
+
+# end GlyphCache #
+
+def rasterize (rects, width, height) :
+    stride = (width + 7) // 8
+    buf = bytearray (stride * height)
+    for xpos, ypos, xlen, ylen in rects :
+        for col in range (xpos, xpos + xlen) :
+            index = col >> 3
+            bit = 0x80 >> (col & 7)
+            for row in range (ypos, ypos + ylen) :
+                buf[row * stride + index] |= bit
+    return buf
@@ -0,0 +1,299 @@
+##################################################################
+# golden.py - Golden image regression check (host side, CPython)
+#   Renders every character and the single segments (TOP_seg ..
+#   BOT_seg) for each parameter combination in CASES into a
+#   MonoCanvas and compares the pixels with the PBM snapshot in
+#   golden/.  Every case is drawn several ways that must all give
+#   the snapshot's pixels:
+#     set_parameters - OLED7Segment (canvas) + set_parameters (**params)
+#     init           - OLED7Segment (canvas, **params)
+#     gfx_pixel      - gfx.GFX with only a pixel function (slow path)
+#     glyph_cache    - gfx.GFX with a bitmap function + glyphcache.GlyphCache
+#     retained       - retained mode update from other characters
+#     display_many   - one display_many call
+#   The set_parameters render time is stored next to the snapshots
+#   (golden/timings.json) and shown beside the current one.
+#   Images that differ are written as golden/<case>.<variant>.pbm.
+#   Then display_number is compared with the same field drawn one
+#   cell at a time by display_character, for random values (negative
+#   fractions, sign cell, zero padding, overflow).
+#
+# Usage:
+#   python golden.py [--update] [--case NAME ...] [--repeat N]
+#                    [--directory golden] [--numbers N]
+#   --update writes the snapshots and timings from this tree.
+#   --numbers sets how many random display_number fields are checked.
+#   Exits with status 1 if any image differs.
+#
+#################################################################
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+import gfx
+from glyphcache import GlyphCache
+from monocanvas import MonoCanvas
+from oled7segment import OLED7Segment
+
+CASES = (
+    ("S", {"digit_size" : "S"}) ,
+    ("S_bold", {"digit_size" : "S", "bold" : True}) ,
+    ("M", {"digit_size" : "M"}) ,
+    ("M_bold", {"digit_size" : "M", "bold" : True}) ,
+    ("L", {"digit_size" : "L"}) ,
+    ("L_bold", {"digit_size" : "L", "bold" : True}) ,
+    ("M_wide", {"digit_size" : "M", "h_segment_length" : 16, "segment_width" : 2}) ,
+    ("custom", {"v_segment_length" : 6 ,
+                "h_segment_length" : 8 ,
+                "segment_width" : 1 ,
+                "spacing" : 2}) ,
+    ("custom_bold", {"v_segment_length" : 3 ,
+                     "h_segment_length" : 5 ,
+                     "segment_width" : 3 ,
+                     "spacing" : 0 ,
+                     "bold" : True}) ,
+    ("seg14_M", {"digit_size" : "M", "segments" : 14}) ,
+    ("seg16_L_bold", {"digit_size" : "L", "bold" : True, "segments" : 16})
+    )
+
+SEGMENT_METHODS = ("TOP_seg", "UL_seg", "UR_seg", "MID_seg", "LL_seg", "LR_seg", "BOT_seg")
+
+def _chars (seven_segment) :
+    return "".join (sorted (seven_segment.segment_masks))
+
+def _canvas (seven_segment) :
+    width = max (seven_segment.measure_string (_chars (seven_segment)) ,
+                 len (SEGMENT_METHODS) * seven_segment.char_wid)
+    return MonoCanvas (width, 2 * seven_segment.char_height)
+
+def _draw_segments (seven_segment) :
+    # Second row: each single segment in its own cell
+    x = 0
+    for name in SEGMENT_METHODS :
+        getattr (seven_segment, name) (x, seven_segment.char_height)
+        x += seven_segment.char_wid
+
+def _canvas_bitmap (canvas) :
+    # Stands in for a native bitmap function (gfx.GFX bitmap=...) so
+    # the glyph cache is used on the host
+    def bitmap (x, y, width, height, buf, color) :
+        stride = (width + 7) // 8
+        for row in range (height) :
+            for col in range (width) :
+                if buf[row * stride + (col >> 3)] & (0x80 >> (col & 7)) :
+                    canvas.pixel (x + col, y + row, color)
+    return bitmap
+
+def _retained_before (seven_segment, chars) :
+    # Same layout as chars (full width cells become "8") so the
+    # update goes through the changed segments path
+    before = ""
+    for char in chars :
+        if seven_segment.glyphs[char][0] == seven_segment.char_wid :
+            before += "8"
+        else :
+            before += char
+    return before
+
+def render (params, variant) :
+    reference = OLED7Segment (None)
+    reference.set_parameters (**params)
+    canvas = _canvas (reference)
+    chars = _chars (reference)
+    cache = None
+    if variant == "init" :
+        seven_segment = OLED7Segment (canvas, **params)
+    else :
+        if variant == "gfx_pixel" :
+            target = gfx.GFX (canvas.width ,
+                              canvas.height ,
+                              lambda x, y, *args : canvas.pixel (x, y, *args))
+        elif variant == "glyph_cache" :
+            target = gfx.GFX (canvas.width ,
+                              canvas.height ,
+                              canvas.pixel ,
+                              bitmap=_canvas_bitmap (canvas))
+        else :
+            target = canvas
+        cache = GlyphCache (max_bytes=65536) if variant == "glyph_cache" else None
+        seven_segment = OLED7Segment (target, glyph_cache=cache)
+        seven_segment.set_parameters (**params)
+    if variant == "retained" :
+        seven_segment.display_string (0, 0, _retained_before (seven_segment, chars), retained=True)
+        seven_segment.display_string (0, 0, chars, retained=True)
+    elif variant == "display_many" :
+        seven_segment.display_many ([(0, 0, chars)])
+    else :
+        seven_segment.display_string (0, 0, chars)
+    _draw_segments (seven_segment)
+    if not cache == None and not cache.stats ()["entries"] :
+        return b""                      # drew rectangles, cache not tested
+    return canvas.pbm ()
+
+def time_render (params, repeat) :
+    # Best time (ns) to draw all characters, set_parameters variant
+    seven_segment = OLED7Segment (None)
+    seven_segment.set_parameters (**params)
+    canvas = _canvas (seven_segment)
+    seven_segment.set_parameters (pixel_display=canvas)
+    chars = _chars (seven_segment)
+    best = None
+    for _ in range (repeat) :
+        start = time.perf_counter_ns ()
+        seven_segment.display_string (0, 0, chars)
+        elapsed = time.perf_counter_ns () - start
+        if best == None or elapsed < best :
+            best = elapsed
+    return best
+
+def _number_cells (value, width, decimals, sign, pad) :
+    # The characters display_number should show, left to right: the
+    # sign cell (None without sign=True) and the width digit cells
+    number = int (round (abs (value) * 10 ** decimals)) if isinstance (value, int) \
+                else int (abs (value) * 10 ** decimals + 0.5)
+    negative = value < 0 and number > 0
+    digits = str (number)
+    if len (digits) <= decimals :
+        digits = "0" * (decimals + 1 - len (digits)) + digits
+    minus = "-" if negative and not sign else ""
+    if len (minus + digits) > width or decimals >= width :
+        cells = "-" * width
+    elif pad == "0" :
+        cells = minus + "0" * (width - len (minus + digits)) + digits
+    else :
+        cells = " " * (width - len (minus + digits)) + minus + digits
+    sign_char = None
+    if sign :
+        sign_char = "-" if negative else "+"
+    return sign_char, cells
+
+def _random_number (rng) :
+    width = rng.randint (1, 5)
+    decimals = rng.randint (0, 3)
+    sign = rng.random () < 0.3
+    pad = rng.choice ((" ", "0"))
+    if rng.random () < 0.3 :
+        value = rng.randint (-10 ** width, 10 ** width)
+    else :
+        value = rng.uniform (-1, 1) * 10 ** rng.randint (0, width)
+    return value, width, decimals, sign, pad
+
+#---- (value, width, decimals, sign, pad) always checked before the random ones
+NUMBER_CASES = (
+    (-0.5, 2, 1, False, " ") ,
+    (-0.5, 2, 1, True, " ") ,
+    (-0.5, 3, 1, False, "0") ,
+    (-0.77, 3, 2, False, "0") ,
+    (-0.77, 4, 2, False, "0") ,
+    (-0.004, 3, 2, False, " ") ,
+    (-12, 2, 0, False, " ") ,
+    (-12, 2, 0, True, "0")
+    )
+
+def check_numbers (count, seed=0) :
+    # Random display_number fields against display_character, returns
+    # the arguments of the first field that differs (None if all match)
+    rng = random.Random (seed)
+    probe = OLED7Segment (None)
+    probe.set_parameters (digit_size="S")
+    canvas_wid = 2 * probe.glyphs["+"][0] + 6 * probe.char_wid
+    cases = list (NUMBER_CASES) + [_random_number (rng) for _ in range (count)]
+    for value, width, decimals, sign, pad in cases :
+        for ghost_color in (-1, 1) :
+            images = []
+            for direct in (True, False) :
+                canvas = MonoCanvas (canvas_wid, probe.char_height)
+                seven_segment = OLED7Segment (canvas, ghost_color=ghost_color)
+                if direct :
+                    seven_segment.display_number (0, 0, value, width, decimals, sign, pad)
+                else :
+                    glyphs = seven_segment.glyphs
+                    sign_char, cells = _number_cells (value, width, decimals, sign, pad)
+                    x = 0
+                    if decimals >= width :
+                        x += glyphs["."][0]     # no point cell, the field keeps its width
+                    if sign :
+                        seven_segment.display_character (x, 0, sign_char)
+                        x += glyphs[sign_char][0]
+                    for cell, char in enumerate (cells) :
+                        if 0 < decimals < width and cell == width - decimals :
+                            seven_segment.display_character (x, 0, ".")
+                            x += glyphs["."][0]
+                        seven_segment.display_character (x, 0, char)
+                        x += seven_segment.char_wid
+                images.append (canvas.pbm ())
+            if not images[0] == images[1] :
+                return value, width, decimals, sign, pad, ghost_color
+    return None
+
+VARIANTS = ("set_parameters", "init", "gfx_pixel", "glyph_cache", "retained", "display_many")
+
+def main () :
+    parser = argparse.ArgumentParser (description="OLED7Segment golden image check")
+    parser.add_argument ("--update", action="store_true", help="write the snapshots")
+    parser.add_argument ("--case", nargs="+", help="only these cases")
+    parser.add_argument ("--repeat", type=int, default=20, help="timing repeats")
+    parser.add_argument ("--numbers", type=int, default=500, help="display_number checks")
+    parser.add_argument ("--directory" ,
+                         default=os.path.join (os.path.dirname (os.path.abspath (__file__)) ,
+                                               "golden"))
+    args = parser.parse_args ()
+    timings_path = os.path.join (args.directory, "timings.json")
+    stored_timings = {}
+    if os.path.exists (timings_path) :
+        with open (timings_path) as timings_file :
+            stored_timings = json.load (timings_file)
+    timings = dict (stored_timings)
+    failures = 0
+    print ("%-14s %-8s %12s %12s  %s" % ("case", "result", "stored us", "now us", "differing"))
+    for name, params in CASES :
+        if args.case and not name in args.case :
+            continue
+        path = os.path.join (args.directory, name + ".pbm")
+        elapsed = time_render (params, args.repeat)
+        timings[name] = elapsed
+        if args.update :
+            os.makedirs (args.directory, exist_ok=True)
+            with open (path, "wb") as snapshot :
+                snapshot.write (render (params, "set_parameters"))
+            print ("%-14s %-8s %12s %12.1f" % (name, "written", "", elapsed / 1000))
+            continue
+        if not os.path.exists (path) :
+            print ("%-14s %-8s" % (name, "missing"))
+            failures += 1
+            continue
+        with open (path, "rb") as snapshot :
+            expected = snapshot.read ()
+        differing = []
+        for variant in VARIANTS :
+            image = render (params, variant)
+            if not image == expected :
+                differing.append (variant)
+                with open (os.path.join (args.directory ,
+                                         "%s.%s.pbm" % (name, variant)), "wb") as actual :
+                    actual.write (image)
+        failures += len (differing) > 0
+        stored = stored_timings.get (name)
+        print ("%-14s %-8s %12s %12.1f  %s" % (name ,
+                                             "FAIL" if differing else "ok" ,
+                                             "" if stored == None else "%.1f" % (stored / 1000) ,
+                                             elapsed / 1000 ,
+                                             " ".join (differing)))
+    if args.update :
+        with open (timings_path, "w") as timings_file :
+            json.dump (timings, timings_file, indent=1, sort_keys=True)
+    elif args.numbers :
+        differing = check_numbers (args.numbers)
+        failures += not differing == None
+        print ("%-14s %-8s %12s %12s  %s" % ("display_number" ,
+                                           "ok" if differing == None else "FAIL" ,
+                                           "", "" ,
+                                           "" if differing == None else repr (differing)))
+    return 1 if failures else 0
+
+if __name__ == "__main__" :
+    sys.exit (main ())
@@ -0,0 +1,146 @@
+##################################################################
+# marquee.py - Scroll 7 segment text through a window
+#   The text is rendered once into an off-screen strip (MonoCanvas),
+#   the unlit segments into a second one when the OLED7Segment has a
+#   ghost_color.
+#   Each step shifts the window left and draws only the newly
+#   exposed columns from the strip, so the work per step depends on
+#   the window, not on the length of the text.
+#   Targets with an SSD1306 page layout buffer (MonoCanvas,
+#   DoubleBuffer.canvas, the ssd1306 driver with page_buffer=True)
+#   are shifted in place with byte copies; other targets (gfx.GFX,
+#   ...) get the window redrawn column by column from the strip.
+#
+# Inputs (__init__ with default values):
+#   seven_segment - OLED7Segment with the size/bold/color/ghost_color
+#                   to use
+#   target - Where to draw (see above), needs fill_rect
+#   xpos, ypos, width - Window position and width (height is the
+#                       character height)
+#   text - Text to scroll, it repeats after gap pixels
+#   gap=None - Pixels between repeats, default one character width
+#   background=0 - Color of unlit pixels
+#   page_buffer=None - True if target.buffer has the SSD1306 page
+#     layout (framebuf MONO_VLSB, e.g. the ssd1306 driver), False to
+#     always redraw.  None: True only for a MonoCanvas target, other
+#     buffers may be in any framebuf format.
+# Methods:
+#   draw () - Draw the whole window at the current position
+#   step (pixels=1) - Scroll left by pixels
+#
+# Typical use:
+# banner = Marquee (seven_segment, oled, 0, 0, 128, "0123456789ABCDEF")
+# banner.draw ()
+# while True :
+#     banner.step ()
+#     oled.show ()
+#
+#################################################################
+
+from monocanvas import MonoCanvas
+from oled7segment import GHOST_OFF
+
+class Marquee :
+    def __init__ (self,
+                    seven_segment ,
+                    target ,
+                    xpos ,
+                    ypos ,
+                    width ,
+                    text ,
+                    gap=None ,
+                    background=0 ,
+                    page_buffer=None) :
+        if gap == None :
+            gap = seven_segment.char_wid
+        self.height = seven_segment.char_height
+        strip_width = seven_segment.measure_string (text) + gap
+        self.strip = MonoCanvas (strip_width, self.height)
+        for x, y, xlen, ylen in seven_segment.string_rects (0, 0, text)[0] :
+            self.strip.fill_rect (x, y, xlen, ylen, 1)
+        self.color = seven_segment.color
+        self.ghost_color = seven_segment.ghost_color
+        self.ghost_strip = None
+        if not self.ghost_color == GHOST_OFF :
+            self.ghost_strip = MonoCanvas (strip_width, self.height)
+            for x, y, xlen, ylen in seven_segment.string_rects (0, 0, text, ghost=True)[0] :
+                self.ghost_strip.fill_rect (x, y, xlen, ylen, 1)
+        self.background = background
+        self.xpos = xpos
+        self.ypos = ypos
+        self.width = width
+        self.offset = 0             # strip column shown at xpos
+        if page_buffer == None :
+            page_buffer = isinstance (target, MonoCanvas)
+        if not page_buffer :
+            self.canvas = target
+            self.shift = False
+        else :
+            self.canvas = MonoCanvas (target.width, target.height, target.buffer)
+            self.shift = True
+            #---- window clipped to the target for the byte shifts
+            x_end = min (xpos + width, target.width)
+            y_end = min (ypos + self.height, target.height)
+            self.clip = (max (xpos, 0), max (ypos, 0), x_end, y_end)
+
+    def draw (self) :
+        for column in range (self.width) :
+            self._draw_column (column)
+
+    def step (self, pixels=1) :
+        self.offset = (self.offset + pixels) % self.strip.width
+        if not self.shift :
+            self.draw ()
+            return
+        #---- only the visible part of the window is shifted, the
+        #     columns exposed at its right edge are drawn
+        x_0, y_0, x_1, y_1 = self.clip
+        if pixels >= x_1 - x_0 :
+            self.draw ()
+            return
+        self._shift_left (pixels)
+        for column in range (x_1 - self.xpos - pixels, x_1 - self.xpos) :
+            self._draw_column (column)
+
+    def _draw_column (self, column) :
+        # Copy one strip column to window column (runs of lit pixels)
+        x = self.xpos + column
+        strip_x = (self.offset + column) % self.strip.width
+        self.canvas.fill_rect (x, self.ypos, 1, self.height, self.background)
+        if not self.ghost_strip == None :
+            self._draw_runs (self.ghost_strip, strip_x, x, self.ghost_color)
+        self._draw_runs (self.strip, strip_x, x, self.color)
+
+    def _draw_runs (self, strip, strip_x, x, color) :
+        start = -1
+        for row in range (self.height + 1) :
+            if row < self.height and strip.buffer[(row >> 3) * strip.width + strip_x] \
+                                        & (1 << (row & 7)) :
+                if start < 0 :
+                    start = row
+            elif start >= 0 :
+                self.canvas.fill_rect (x, self.ypos + start, 1, row - start, color)
+                start = -1
+
+    def _shift_left (self, pixels) :
+        x_0, y_0, x_1, y_1 = self.clip
+        count = x_1 - x_0 - pixels
+        if count <= 0 or y_0 >= y_1 :
+            return
+        buf = memoryview (self.canvas.buffer)
+        page_width = self.canvas.width
+        page = y_0 >> 3
+        while page * 8 < y_1 :
+            top = max (y_0 - page * 8, 0)
+            bottom = min (y_1 - page * 8, 8)
+            mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+            start = page * page_width + x_0
+            if mask == 0xFF :
+                buf[start:start + count] = buf[start + pixels:start + pixels + count]
+            else :
+                keep = mask ^ 0xFF
+                for index in range (start, start + count) :
+                    buf[index] = (buf[index] & keep) | (buf[index + pixels] & mask)
+            page += 1
+
+# end Marquee #
@@ -0,0 +1,116 @@
+##################################################################
+# monocanvas.py - Pure Python monochrome frame buffer
+#   bytearray canvas with the SSD1306 page layout: one byte holds
+#   8 vertical pixels (LSB on top), pages of 8 rows are stored one
+#   after the other, width bytes per page (framebuf MONO_VLSB).
+#   The buffer can be sent to an SSD1306 unchanged and the canvas
+#   can be used on a host without any display hardware.
+#
+# Inputs (__init__ with default values):
+#   width=128 - Width in pixels
+#   height=64 - Height in pixels (rounded up to whole pages in buffer)
+#   buffer=None - Existing bytearray to draw into (e.g. oled.buffer)
+# Methods (same arguments as framebuf.FrameBuffer):
+#   pixel (x, y, color=None) - Set a pixel, or return it if no color
+#   hline (x, y, width, color)
+#   vline (x, y, height, color)
+#   fill_rect (x, y, width, height, color)
+#   rect (x, y, width, height, color)
+#   fill (color)
+#   show () - Does nothing, so code written for a display runs as is
+#   pbm () - Image as binary PBM (P4) bytes
+#
+# Typical use:
+# canvas = MonoCanvas (128, 64)
+# graphic = gfx.GFX (128, 64, canvas.pixel)
+# seven_segment = OLED7Segment (graphic)
+#
+#################################################################
+
+class MonoCanvas :
+    def __init__ (self, width=128, height=64, buffer=None) :
+        self.width = width
+        self.height = height
+        self.pages = (height + 7) // 8
+        if buffer == None :
+            buffer = bytearray (width * self.pages)
+        self.buffer = buffer
+        self._ones = memoryview (b"\xff" * width)
+        self._zeros = memoryview (bytes (width))
+
+    def pixel (self, x, y, color=None) :
+        if x < 0 or x >= self.width or y < 0 or y >= self.height :
+            return 0
+        index = (y >> 3) * self.width + x
+        bit = 1 << (y & 7)
+        if color == None :
+            return 1 if self.buffer[index] & bit else 0
+        if color :
+            self.buffer[index] |= bit
+        else :
+            self.buffer[index] &= ~bit
+
+    def hline (self, x, y, width, color) :
+        self.fill_rect (x, y, width, 1, color)
+
+    def vline (self, x, y, height, color) :
+        self.fill_rect (x, y, 1, height, color)
+
+    def rect (self, x, y, width, height, color) :
+        self.fill_rect (x, y, width, 1, color)
+        self.fill_rect (x, y + height - 1, width, 1, color)
+        self.fill_rect (x, y, 1, height, color)
+        self.fill_rect (x + width - 1, y, 1, height, color)
+
+    def fill (self, color) :
+        self.fill_rect (0, 0, self.width, self.height, color)
+
+    def fill_rect (self, x, y, width, height, color) :
+        #---- clip
+        x_end = min (x + width, self.width)
+        y_end = min (y + height, self.height)
+        if x < 0 :
+            x = 0
+        if y < 0 :
+            y = 0
+        if x >= x_end or y >= y_end :
+            return
+        buf = self.buffer
+        count = x_end - x
+        page = y >> 3
+        while page * 8 < y_end :
+            top = max (y - page * 8, 0)
+            bottom = min (y_end - page * 8, 8)
+            mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+            start = page * self.width + x
+            if mask == 0xFF :       # whole bytes, one slice copy
+                if color :
+                    buf[start:start + count] = self._ones[:count]
+                else :
+                    buf[start:start + count] = self._zeros[:count]
+            elif color :
+                for index in range (start, start + count) :
+                    buf[index] |= mask
+            else :
+                mask ^= 0xFF
+                for index in range (start, start + count) :
+                    buf[index] &= mask
+            page += 1
+
+    def show (self) :
+        pass
+
+    def pbm (self) :
+        stride = (self.width + 7) // 8
+        out = bytearray (stride * self.height)
+        buf = self.buffer
+        for y in range (self.height) :
+            base = (y >> 3) * self.width
+            bit = 1 << (y & 7)
+            row = y * stride
+            for x in range (self.width) :
+                if buf[base + x] & bit :
+                    out[row + (x >> 3)] |= 0x80 >> (x & 7)
+        return b"P4\n%d %d\n" % (self.width, self.height) + bytes (out)
+
+# end MonoCanvas #
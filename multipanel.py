@@ -0,0 +1,90 @@
+##################################################################
+# multipanel.py - Several displays side by side as one canvas
+#   Each rectangle is clipped, split at panel boundaries and only
+#   the pieces are sent to the panels they touch.  Panels that were
+#   drawn on are marked dirty and show () only flushes those.
+#
+# Inputs (__init__ with default values):
+#   panels - List of displays left to right (e.g. ssd1306 drivers),
+#            each needs fill_rect, pixel, fill and show
+#   panel_width=128 - Width of every panel in pixels
+#   panel_height=64 - Height of every panel in pixels
+# Methods (same arguments as framebuf.FrameBuffer):
+#   pixel (x, y, color=None), hline, vline, fill_rect, rect, fill
+#   show () - show () on dirty panels only, then marks them clean
+#
+# Typical use:
+# wall = PanelCanvas ([oled_1, oled_2, oled_3])
+# graphic = gfx.GFX (wall.width, wall.height, wall.pixel)
+# seven_segment = OLED7Segment (graphic)
+# seven_segment.display_string (100, 0, "12:34")  # crosses two panels
+# wall.show ()
+#
+#################################################################
+
+class PanelCanvas :
+    def __init__ (self, panels, panel_width=128, panel_height=64) :
+        self.panels = panels
+        self.panel_width = panel_width
+        self.width = panel_width * len (panels)
+        self.height = panel_height
+        self.dirty = [False] * len (panels)
+
+    def pixel (self, x, y, color=None) :
+        if x < 0 or x >= self.width or y < 0 or y >= self.height :
+            return 0
+        index = x // self.panel_width
+        if color == None :
+            return self.panels[index].pixel (x - index * self.panel_width, y)
+        self.panels[index].pixel (x - index * self.panel_width, y, color)
+        self.dirty[index] = True
+
+    def fill_rect (self, x, y, width, height, color) :
+        #---- clip to the whole canvas
+        x_end = min (x + width, self.width)
+        y_end = min (y + height, self.height)
+        if x < 0 :
+            x = 0
+        if y < 0 :
+            y = 0
+        if x >= x_end or y >= y_end :
+            return
+        #---- one piece per panel touched
+        panel_width = self.panel_width
+        index = x // panel_width
+        while x < x_end :
+            left = index * panel_width
+            right = min (left + panel_width, x_end)
+            self.panels[index].fill_rect (x - left ,
+                                          y ,
+                                          right - x ,
+                                          y_end - y ,
+                                          color)
+            self.dirty[index] = True
+            x = right
+            index += 1
+
+    def hline (self, x, y, width, color) :
+        self.fill_rect (x, y, width, 1, color)
+
+    def vline (self, x, y, height, color) :
+        self.fill_rect (x, y, 1, height, color)
+
+    def rect (self, x, y, width, height, color) :
+        self.fill_rect (x, y, width, 1, color)
+        self.fill_rect (x, y + height - 1, width, 1, color)
+        self.fill_rect (x, y, 1, height, color)
+        self.fill_rect (x + width - 1, y, 1, height, color)
+
+    def fill (self, color) :
+        for index in range (len (self.panels)) :
+            self.panels[index].fill (color)
+            self.dirty[index] = True
+
+    def show (self) :
+        for index in range (len (self.panels)) :
+            if self.dirty[index] :
+                self.panels[index].show ()
+                self.dirty[index] = False
+
+# end PanelCanvas #
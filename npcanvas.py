@@ -0,0 +1,134 @@
+##################################################################
+# npcanvas.py - NumPy canvas for host side rendering (optional)
+#   Requires numpy, intended for simulators and generating preview
+#   images, not for MicroPython.  Every segment rectangle becomes
+#   one slice assignment on a 2-D uint8 array (rows, columns).
+#
+# NumpyCanvas (width=128, height=64)
+#   pixel, hline, vline, fill_rect, rect, fill, show
+#     Same arguments as framebuf.FrameBuffer, so it can be used
+#     through gfx.GFX or passed to OLED7Segment directly
+#   draw_string (seven_segment, xpos, ypos, chars, color=None)
+#     display_string of an OLED7Segment (unlit segments in its
+#     ghost_color unless GHOST_OFF), returns the final x
+#   array - The (height, width) uint8 image
+#
+# render_batch (seven_segment, items, width=128, height=64, color=None)
+#   Renders N strings into an (N, height, width) uint8 array.
+#   items are strings (drawn at 0, 0) or (xpos, ypos, chars).
+#   Each distinct rectangle is assigned to all frames that contain
+#   it in one vectorized operation, ghost rectangles (ghost_color)
+#   first.
+#
+#################################################################
+
+try :
+    import numpy as np
+except ImportError :
+    np = None
+
+from oled7segment import GHOST_OFF
+
+def _require_numpy () :
+    if np == None :
+        raise ImportError ("npcanvas requires numpy")
+
+def _clip (xpos, ypos, width, height, canvas_width, canvas_height) :
+    x_end = min (xpos + width, canvas_width)
+    y_end = min (ypos + height, canvas_height)
+    xpos = max (xpos, 0)
+    ypos = max (ypos, 0)
+    if xpos >= x_end or ypos >= y_end :
+        return None
+    return xpos, ypos, x_end, y_end
+
+class NumpyCanvas :
+    def __init__ (self, width=128, height=64) :
+        _require_numpy ()
+        self.width = width
+        self.height = height
+        self.array = np.zeros ((height, width), dtype=np.uint8)
+
+    def pixel (self, x, y, color=None) :
+        if x < 0 or x >= self.width or y < 0 or y >= self.height :
+            return 0
+        if color == None :
+            return int (self.array[y, x])
+        self.array[y, x] = color
+
+    def fill_rect (self, x, y, width, height, color) :
+        clipped = _clip (x, y, width, height, self.width, self.height)
+        if not clipped == None :
+            x_0, y_0, x_1, y_1 = clipped
+            self.array[y_0:y_1, x_0:x_1] = color
+
+    def hline (self, x, y, width, color) :
+        self.fill_rect (x, y, width, 1, color)
+
+    def vline (self, x, y, height, color) :
+        self.fill_rect (x, y, 1, height, color)
+
+    def rect (self, x, y, width, height, color) :
+        self.fill_rect (x, y, width, 1, color)
+        self.fill_rect (x, y + height - 1, width, 1, color)
+        self.fill_rect (x, y, 1, height, color)
+        self.fill_rect (x + width - 1, y, 1, height, color)
+
+    def fill (self, color) :
+        self.array[:, :] = color
+
+    def show (self) :
+        pass
+
+    def draw_string (self, seven_segment, xpos, ypos, chars, color=None) :
+        if color == None :
+            color = seven_segment.color
+        if not seven_segment.ghost_color == GHOST_OFF :
+            for x, y, width, height in seven_segment.string_rects (xpos ,
+                                                                   ypos ,
+                                                                   chars ,
+                                                                   ghost=True)[0] :
+                self.fill_rect (x, y, width, height, seven_segment.ghost_color)
+        rects, x_end = seven_segment.string_rects (xpos, ypos, chars)
+        for x, y, width, height in rects :
+            self.fill_rect (x, y, width, height, color)
+        return x_end
+
+# end NumpyCanvas #
+
+def render_batch (seven_segment, items, width=128, height=64, color=None) :
+    _require_numpy ()
+    if color == None :
+        color = seven_segment.color
+    ghost = not seven_segment.ghost_color == GHOST_OFF
+    #---- rectangle -> indexes of the frames that contain it
+    frames = {}
+    ghost_frames = {}
+    count = 0
+    for item in items :
+        if isinstance (item, str) :
+            xpos, ypos, chars = 0, 0, item
+        else :
+            xpos, ypos, chars = item
+        _add_frame (frames, seven_segment.string_rects (xpos, ypos, chars)[0], count)
+        if ghost :
+            _add_frame (ghost_frames ,
+                        seven_segment.string_rects (xpos, ypos, chars, ghost=True)[0] ,
+                        count)
+        count += 1
+    stack = np.zeros ((count, height, width), dtype=np.uint8)
+    for rects, rect_color in ((ghost_frames, seven_segment.ghost_color), (frames, color)) :
+        for rect, indexes in rects.items () :
+            clipped = _clip (rect[0], rect[1], rect[2], rect[3], width, height)
+            if not clipped == None :
+                x_0, y_0, x_1, y_1 = clipped
+                stack[np.array (indexes), y_0:y_1, x_0:x_1] = rect_color
+    return stack
+
+def _add_frame (frames, rects, index) :
+    for rect in rects :
+        indexes = frames.get (rect)
+        if indexes == None :
+            frames[rect] = [index]
+        elif not indexes[-1] == index :
+            indexes.append (index)
@@ -6,18 +6,63 @@
 # Inputs (__init__ or set_parameters with default values):
 #   pixel_display - No default, pixel display function from gfx
 #   digit_size="S" - Up to 4 lines, "M" up to 2 lines, "L" 1 line (128x64)
+#     (None in __init__ is "S", any other value raises ValueError)
 #   v_segment_length=4 - Vertical segment lingth in pixels
 #   h_segment_length=4 - Horizontal segment lingth in pixels
 #   segment_width=2 - Segment (all) width
 #   spacing=1 - pixels between/below segments
+#     (the 4 settings above default to the digit_size values and
+#     override them when given)
 #   color=1 - 1 for monochrome
+#   segments=7 - 14 or 16 for the alphanumeric modes (segment16.py),
+#     upper/lower case letters and more symbols
+#   ghost_color=GHOST_OFF - Color for the unlit segments of each character
+#     cell, like a real display (e.g. a dim gray level on SSD1322 /
+#     SH1107 grayscale).  Lit and unlit segments are precomputed as
+#     non-overlapping rectangles, so every pixel is written once.
+#     GHOST_OFF (-1, the default) draws nothing for unlit segments.
+#   font=None - (__init__ only) module made by fontcompile.py, its
+#     precomputed geometry replaces the size settings (see load_font)
+#   glyph_cache=None - (__init__ only) glyphcache.GlyphCache, characters
+#     are rasterized once per parameter set and drawn with one native
+#     blit instead of one fill_rect per segment.  Only used when
+#     pixel_display can blit natively: a framebuf.FrameBuffer based
+#     driver (blit) or a gfx.GFX with native_bitmap.  Other displays
+#     (MonoCanvas, plain drivers) keep drawing rectangles.
 # Methods:
-#   display_string (xpos, ypos, chars)
+#   display_string (xpos, ypos, chars, retained=False, background=0)
 #     Displays chars at x position, y position
+#     retained=True only repaints segments that changed since the last
+#     retained call at xpos, ypos and returns the dirty box (see below)
+#   string_rects (xpos, ypos, chars, ghost=False)
+#     Returns the (x, y, width, height) rectangles display_string
+#     would fill (with ghost_color if ghost=True) and the x position
+#     after the last character
+#   display_number (xpos, ypos, value, width, decimals=0, sign=False, pad=" ")
+#     Right aligned number in a fixed width field, no string building
+#   update_mask (xpos, ypos, old_mask, new_mask, background=0)
+#     Changes a character cell between two SEG_* masks, drawing only
+#     the segments that differ (used by animate.SegmentAnimator)
+#   measure_string (chars)
+#     Width of chars without drawing them
+#   layout (chars, (x, y, width, height), align="left")
+#     xpos, ypos to draw chars left/center/right aligned in a box
+#   display_many ([(xpos, ypos, chars, parameters), ...])
+#     Draws several strings (parameters optional, a set_parameters
+#     dict) merging overlapping/abutting rectangles before filling
 #   display_character (xpos, ypos, char) # Called by display_string
 #     Displays char at x position, y position
 #     Only 1 character allowed
 #     Unknown characters are displayed as '?'
+#   TOP_seg, UL_seg, UR_seg, MID_seg, LL_seg, LR_seg, BOT_seg
+#     (xpos, ypos, color=None) draw a single segment (the left half
+#     of a split bar in the 14/16 segment modes)
+#
+# Characters are defined in SEGMENT_MASKS as a mask of SEG_* bits
+# (SEGMENT14_MASKS/SEGMENT16_MASKS in segment16.py for 14/16 segments).
+# set_parameters computes the segment rectangles once per parameter
+# set (shared by all instances), so drawing a character only walks
+# its cached rectangle list.
 #
 # Typical imports:
 # from machine import Pin, SoftI2C
@@ -26,111 +71,156 @@
 #
 #################################################################
 
+from glyphcache import rasterize
+
+try :
+    import framebuf
+except ImportError :                # CPython, no native blit
+    framebuf = None
+
+#----------------------------------------------------------------------------------
+# Segment bits, one per rectangle that can be lit in a character cell
+#  TOP through BOT are the classic 7 segments, the rest are the
+#  narrow symbols (decimal point, colon, sign bars)
+#------------------------------
+SEG_TOP = 0x001
+SEG_UL = 0x002
+SEG_UR = 0x004
+SEG_MID = 0x008
+SEG_LL = 0x010
+SEG_LR = 0x020
+SEG_BOT = 0x040
+SEG_DP = 0x080          # decimal point (also lower colon dot)
+SEG_COLON = 0x100       # upper colon dot
+SEG_SIGN_H = 0x200      # minus bar (also horizontal plus bar)
+SEG_SIGN_V = 0x400      # vertical plus bar
+
+SEGMENT_BITS = (SEG_TOP, SEG_UL, SEG_UR, SEG_MID, SEG_LL, SEG_LR, SEG_BOT,
+                SEG_DP, SEG_COLON, SEG_SIGN_H, SEG_SIGN_V)
+SYMBOL_BITS = SEG_DP | SEG_COLON | SEG_SIGN_H | SEG_SIGN_V  # never ghosted
+
+GHOST_OFF = -1          # ghost_color value for no ghost segments
+
+#----------------------------------------------------------------------------------
+# Character -> segment mask
+#------------------------------
+SEGMENT_MASKS = {
+    "0" : SEG_TOP | SEG_UL | SEG_UR | SEG_LL | SEG_LR | SEG_BOT ,
+    "1" : SEG_UR | SEG_LR ,
+    "2" : SEG_TOP | SEG_UR | SEG_MID | SEG_LL | SEG_BOT ,
+    "3" : SEG_TOP | SEG_UR | SEG_MID | SEG_LR | SEG_BOT ,
+    "4" : SEG_UL | SEG_UR | SEG_MID | SEG_LR ,
+    "5" : SEG_TOP | SEG_UL | SEG_MID | SEG_LR | SEG_BOT ,
+    "6" : SEG_TOP | SEG_UL | SEG_MID | SEG_LL | SEG_LR | SEG_BOT ,
+    "7" : SEG_TOP | SEG_UR | SEG_LR ,
+    "8" : SEG_TOP | SEG_UL | SEG_UR | SEG_MID | SEG_LL | SEG_LR | SEG_BOT ,
+    "9" : SEG_TOP | SEG_UL | SEG_UR | SEG_MID | SEG_LR | SEG_BOT ,
+    "A" : SEG_TOP | SEG_UL | SEG_UR | SEG_MID | SEG_LL | SEG_LR ,
+    "B" : SEG_UL | SEG_MID | SEG_LL | SEG_LR | SEG_BOT ,
+    "C" : SEG_TOP | SEG_UL | SEG_LL | SEG_BOT ,
+    "D" : SEG_UR | SEG_MID | SEG_LL | SEG_LR | SEG_BOT ,
+    "E" : SEG_TOP | SEG_UL | SEG_MID | SEG_LL | SEG_BOT ,
+    "F" : SEG_TOP | SEG_UL | SEG_MID | SEG_LL ,
+    "?" : SEG_TOP | SEG_UR | SEG_MID | SEG_LL ,
+    " " : 0 ,
+    "." : SEG_DP ,
+    ":" : SEG_DP | SEG_COLON ,
+    "-" : SEG_SIGN_H ,
+    "+" : SEG_SIGN_H | SEG_SIGN_V
+    }
+for _char in "ABCDEF" :
+    SEGMENT_MASKS[_char.lower ()] = SEGMENT_MASKS[_char]
+
+MEASURE_CACHE_SIZE = 32         # strings memoized by measure_string
+GEOMETRY_CACHE_SIZE = 8         # parameter sets kept in _geometry
+
+#----------------------------------------------------------------------------------
+# (segments, v_segment_len, h_segment_len, segment_wid, spacing, bold) ->
+#   (segment_bits, segment_masks, segment_rects, segment_overlaps,
+#    glyphs, digit_glyphs, char_wid, char_height, sign_seg_len), the
+#    key + ("ghost",) for ghost glyphs, (font module, ghost) for
+#    load_font
+#  Shared by all instances, so a dozen fields of the same size hold one
+#  copy of the tables.  The tables are never modified once built.
+#------------------------------
+_geometry = {}
+
 class OLED7Segment :
+    # Only per instance settings and one reference to the shared
+    # geometry tuple (see _geometry), the tables and sizes are read
+    # from it.  MicroPython ignores __slots__, so the attribute count is
+    # what keeps an instance small there; CPython also drops __dict__.
+    __slots__ = ("pixel_display", "glyph_cache", "blit_mode", "palette" ,
+                 "retained", "profiler" ,
+                 "v_segment_len", "h_segment_len", "segment_wid", "spacing" ,
+                 "bold", "color", "segments", "ghost_color" ,
+                 "geometry", "string_widths", "cache_params")
+
+    #---- read from the shared geometry tuple
+    @property
+    def segment_bits (self) :
+        return self.geometry[0]
+    @property
+    def segment_masks (self) :
+        return self.geometry[1]
+    @property
+    def segment_rects (self) :
+        return self.geometry[2]
+    @property
+    def segment_overlaps (self) :
+        return self.geometry[3]
+    @property
+    def glyphs (self) :
+        return self.geometry[4]
+    @property
+    def digit_glyphs (self) :
+        return self.geometry[5]
+    @property
+    def char_wid (self) :
+        return self.geometry[6]
+    @property
+    def char_height (self) :
+        return self.geometry[7]
+    @property
+    def sign_seg_len (self) :
+        return self.geometry[8]
+
     def __init__ (self,
                     pixel_display ,
                     digit_size="S" ,
-                    v_segment_length=4 ,
-                    h_segment_length=4 ,
-                    segment_width=2,
-                    spacing=1 ,
+                    v_segment_length=None ,
+                    h_segment_length=None ,
+                    segment_width=None ,
+                    spacing=None ,
                     bold=False ,
-                    color=1) :
+                    color=1 ,
+                    glyph_cache=None ,
+                    font=None ,
+                    segments=7 ,
+                    ghost_color=GHOST_OFF) :
+        self.glyph_cache = glyph_cache
+        self.blit_mode = None       # see _set_display
+        self.retained = None        # (xpos, ypos) -> last retained string, made when needed
+        self.profiler = None        # set by profiler.Profiler.attach
+        self.ghost_color = ghost_color
+        self.spacing = 1            # digit_size "S" and "M" keep the spacing
+        if not font == None :
+            self._set_display (pixel_display)
+            self.color = color
+            self.load_font (font)
+            return
+        if digit_size == None :     # the size settings start from "S"
+            digit_size = "S"
         self.set_parameters  (pixel_display=pixel_display ,
-                              digit_size="S" ,
+                              digit_size=digit_size ,
                               v_segment_length=v_segment_length ,
                               h_segment_length=h_segment_length ,
                               segment_width=segment_width ,
                               spacing=spacing ,
                               bold=bold ,
-                              color=color)
-        self.segment_chars = {
-            "0" : {
-                "handler" : self.zero_seg
-                } ,
-            "1" : {
-                "handler" : self.one_seg
-                } ,
-            "2" : {
-                "handler" : self.two_seg
-                } ,
-            "3" : {
-                "handler" : self.three_seg
-                } ,
-            "4" : {
-                "handler" : self.four_seg
-                } ,
-            "5" : {
-                "handler" : self.five_seg
-                } ,
-            "6" : {
-                "handler" : self.six_seg
-                } ,
-            "7" : {
-                "handler" : self.seven_seg
-                } ,
-            "8" : {
-                "handler" : self.eight_seg
-                } ,
-            "9" : {
-                "handler" : self.nine_seg
-                } ,
-            "." : {
-                "handler" : self.decimal_point_seg
-                } ,
-            "+" : {
-                "handler" : self.plus_seg
-                } ,
-            "-" : {
-                "handler" : self.minus_seg
-                } ,
-            ":" : {
-                "handler" : self.colon_seg
-                } ,
-            "?" : {
-                "handler" : self.question_seg
-                } ,
-            " " : {
-                "handler" : self.space_seg
-                } ,
-            "A" : {
-                "handler" : self.a_seg
-                } ,
-            "a" : {
-                "handler" : self.a_seg
-                } ,
-            "B" : {
-                "handler" : self.b_seg
-                } ,
-            "b" : {
-                "handler" : self.b_seg
-                } ,
-            "C" : {
-                "handler" : self.c_seg
-                } ,
-            "c" : {
-                "handler" : self.c_seg
-                } ,
-            "D" : {
-                "handler" : self.d_seg
-                } ,
-            "d" : {
-                "handler" : self.d_seg
-                } ,
-            "E" : {
-                "handler" : self.e_seg
-                } ,
-            "e" : {
-                "handler" : self.e_seg
-                } ,
-            "F" : {
-                "handler" : self.f_seg
-                } ,
-            "f" : {
-                "handlhttp://localhost:5010/er" : self.f_seg
-                }
-            }
-    
+                              color=color ,
+                              segments=segments)
+
     def set_parameters (self ,
                         pixel_display=None ,
                         digit_size=None ,
@@ -139,9 +229,13 @@ class OLED7Segment :
                         segment_width=None ,
                         spacing=None ,
                         bold=None ,
-                        color=None) :
+                        color=None ,
+                        segments=None ,
+                        ghost_color=None) :
+        if not digit_size in (None, "S", "M", "L") :
+            raise ValueError ("digit_size must be 'S', 'M' or 'L'")
         if not pixel_display == None :
-            self.pixel_display = pixel_display
+            self._set_display (pixel_display)
         if not digit_size == None :
             if digit_size == "S" :        # Small digits
                 self.v_segment_len = 4
@@ -169,28 +263,66 @@ class OLED7Segment :
             self.bold = bold
         if not color == None :             # Color
             self.color = color
-        #---- char/digit width
-        self.char_wid = self.segment_wid \
-                        + self.h_segment_len \
-                        + self.segment_wid \
-                        + self.spacing
-        #---- char/digit height
-        self.char_height = self.segment_wid \
-                        + self.v_segment_len \
-                        + self.segment_wid \
-                        + self.v_segment_len \
-                        + self.segment_wid \
-                        + self.spacing
-        #---- sign segment length
-        self.sign_seg_len = max (self.v_segment_len,
-                                self.h_segment_len)
-        if self.sign_seg_len < 5 :
-            self.sign_seg_len = 5
-        elif self.sign_seg_len % 2 != 0 :
-            self.sign_seg_len -= 1
+        if not segments == None :          # 7, 14 or 16 segments
+            self.segments = segments
+        if not ghost_color == None :       # unlit segments, GHOST_OFF for none
+            self.ghost_color = ghost_color
+        #---- sizes, segment/character rectangles for these parameters
+        self._build_glyphs ()
+        self._glyphs_changed ()
 
 # end set_parameters #
 
+    #----------------------------------------------------------------------------------
+    # load_font (font) - Use a module generated by fontcompile.py instead
+    #   of computing the geometry.  The module's constant tuples (in
+    #   flash when the module is frozen) are used as is, only the
+    #   lookup dicts pointing into them are made (once per font and
+    #   ghost setting, shared in _geometry).  Ghost rectangles are
+    #   precompiled too.
+    #------------------------------
+    def load_font (self, font) :
+        self.v_segment_len = font.V_SEGMENT_LEN
+        self.h_segment_len = font.H_SEGMENT_LEN
+        self.segment_wid = font.SEGMENT_WID
+        self.spacing = font.SPACING
+        self.bold = font.BOLD
+        self.segments = font.SEGMENTS
+        ghost = not self.ghost_color == GHOST_OFF
+        self.geometry = _cached_geometry ((font, ghost) ,
+                                          lambda : _font_geometry (font, ghost))
+        self._glyphs_changed ()
+    def _set_display (self, pixel_display) :
+        # blit_mode: how the glyph cache draws on pixel_display, "blit"
+        # (FrameBuffer.blit), "gfx_blit" (gfx.GFX bitmap over a native
+        # blit, given the cached FrameBuffer), "bitmap" (other gfx.GFX
+        # native bitmap) or None (no cache or no native blit, draw
+        # rectangles)
+        self.pixel_display = pixel_display
+        self.blit_mode = None
+        if self.glyph_cache == None or pixel_display == None :
+            return
+        if getattr (pixel_display, "native_blit", False) :
+            self.blit_mode = "gfx_blit"
+        elif getattr (pixel_display, "native_bitmap", False) :
+            self.blit_mode = "bitmap"
+        elif not framebuf == None and hasattr (pixel_display, "blit") :
+            self.blit_mode = "blit"
+    def _glyphs_changed (self) :
+        self.string_widths = None   # measure_string memo, made when needed
+        self.palette = None         # blit palette for self.color, made when needed
+        #---- glyph_cache key for these parameters
+        self.cache_params = None
+        if self.glyph_cache == None :
+            return
+        self.cache_params = (self.segments ,
+                             self.v_segment_len ,
+                             self.h_segment_len ,
+                             self.segment_wid ,
+                             self.spacing ,
+                             self.bold ,
+                             self.color)
+
     #----------------------------------------------------------------------------------
     # Segment identifiers:
     # bold=False    bold=True
@@ -206,363 +338,805 @@ class OLED7Segment :
     # x       x     x       x
     #  xxBOTxx      xxxBOTxxx
     #
+    # All rectangles are (dx, dy, width, height) relative to the
+    # character origin and are only computed when parameters change.
+    # segment_rects maps each bit to a tuple of rectangles (one, or a
+    # staircase for the 14/16 segment diagonals).
+    # A character's segments are repartitioned into as few
+    # non-overlapping rectangles as found, so bold corners are filled
+    # once (bold "8" is 2 full height sides + TOP, MID, BOT).
+    # Instances with the same geometry share the tables (_geometry).
+    # With ghost_color set every glyph gets a third item, the unlit
+    # segments as rectangles not overlapping the lit ones.
     #------------------------------
-    def TOP_seg (self, xpos_in, ypos_in, color_in=None) :
+    def _build_glyphs (self) :
+        key = (self.segments ,
+               self.v_segment_len ,
+               self.h_segment_len ,
+               self.segment_wid ,
+               self.spacing ,
+               self.bold)
+        geometry = _cached_geometry (key, self._make_geometry)
+        if not self.ghost_color == GHOST_OFF :
+            plain = geometry
+            geometry = _cached_geometry (key + ("ghost" ,) ,
+                                         lambda : plain[:4]
+                                                    + _ghost_glyphs (plain[0] ,
+                                                                     plain[1] ,
+                                                                     plain[2] ,
+                                                                     plain[4])
+                                                    + plain[6:])
+        self.geometry = geometry
+    def _make_geometry (self) :
+        wid = self.segment_wid
+        v_len = self.v_segment_len
+        h_len = self.h_segment_len
+        #---- char/digit width and height
+        char_wid = wid + h_len + wid + self.spacing
+        char_height = wid + v_len + wid + v_len + wid + self.spacing
+        #---- sign segment length
+        sign_len = max (v_len, h_len)
+        if sign_len < 5 :
+            sign_len = 5
+        elif sign_len % 2 != 0 :
+            sign_len -= 1
+        full_wid = wid + h_len + wid
+        full_len = wid + v_len + wid
+        right = wid + h_len
+        mid = wid + v_len
+        bot = wid + v_len + wid + v_len
         if self.bold :
-            xpos = xpos_in
-            xlen = self.segment_wid + self.h_segment_len + self.segment_wid
+            rects = {
+                SEG_TOP : (0, 0, full_wid, wid) ,
+                SEG_UL : (0, 0, wid, full_len) ,
+                SEG_UR : (right, 0, wid, full_len) ,
+                SEG_MID : (0, mid, full_wid, wid) ,
+                SEG_LL : (0, mid, wid, full_len) ,
+                SEG_LR : (right, mid, wid, full_len) ,
+                SEG_BOT : (0, bot, full_wid, wid)
+                }
         else :
-            xpos = xpos_in + self.segment_wid
-            xlen = self.h_segment_len
-        ypos = ypos_in
-        if not color_in == None :
-            seg_color = color_in
+            rects = {
+                SEG_TOP : (wid, 0, h_len, wid) ,
+                SEG_UL : (0, wid, wid, v_len) ,
+                SEG_UR : (right, wid, wid, v_len) ,
+                SEG_MID : (wid, mid, h_len, wid) ,
+                SEG_LL : (0, mid + wid, wid, v_len) ,
+                SEG_LR : (right, mid + wid, wid, v_len) ,
+                SEG_BOT : (wid, bot, h_len, wid)
+                }
+        rects[SEG_DP] = (0, bot, wid, wid)
+        rects[SEG_COLON] = (0, mid, wid, wid)
+        rects[SEG_SIGN_H] = (0, mid, sign_len, wid)
+        rects[SEG_SIGN_V] = (sign_len // 2 - wid // 2 ,
+                             mid - sign_len // 2 + 1 ,
+                             wid ,
+                             sign_len)
+        bits, masks = _segment_tables (self.segments)
+        if self.segments == 7 :
+            parts = {}
+            for bit in bits :
+                parts[bit] = (rects[bit] ,)
         else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        xlen ,
-                                        self.segment_wid ,
-                                        seg_color)
+            import segment16
+            parts = segment16.segment_rects (self.segments, rects, wid, v_len, h_len)
+            parts[SEG_DP] = (rects[SEG_DP] ,)
+            parts[SEG_COLON] = (rects[SEG_COLON] ,)
+        #---- bit -> mask of segments sharing pixels with it (bold corners)
+        overlaps = {}
+        for bit in bits :
+            overlaps[bit] = 0
+            for other in bits :
+                if _touching (parts[bit], parts[other]) :
+                    overlaps[bit] |= other
+        #---- character -> (advance width, rectangles)
+        point_wid = wid + self.spacing
+        sign_wid = sign_len + self.spacing
+        glyphs = {}
+        for char, mask in masks.items () :
+            if mask and not mask & ~(SEG_DP | SEG_COLON) :
+                advance = point_wid
+            elif mask & SEG_SIGN_H :
+                advance = sign_wid
+            else :
+                advance = char_wid
+            glyphs[char] = (advance ,
+                            partition_rects ([rect
+                                                for bit in bits
+                                                    if mask & bit
+                                                        for rect in parts[bit]]))
+        return (bits ,
+                masks ,
+                parts ,
+                overlaps ,
+                glyphs ,
+                tuple (glyphs[char] for char in "0123456789") ,
+                char_wid ,
+                char_height ,
+                sign_len)
+
+    def _segment (self, bit, xpos, ypos, color_in) :
+        if color_in == None :
+            color_in = self.color
+        for dx, dy, xlen, ylen in self.segment_rects[bit] :
+            self.pixel_display.fill_rect (xpos + dx ,
+                                            ypos + dy ,
+                                            xlen ,
+                                            ylen ,
+                                            color_in)
+        if not self.profiler == None :
+            self.profiler.rects_filled (len (self.segment_rects[bit]))
+    #------------------------------
+    def TOP_seg (self, xpos_in, ypos_in, color_in=None) :
+        self._segment (SEG_TOP, xpos_in, ypos_in, color_in)
     def UL_seg (self, xpos_in, ypos_in, color_in=None) :
-        xpos = xpos_in
-        if self.bold :
-            ypos = ypos_in
-            ylen = self.segment_wid + self.v_segment_len + self.segment_wid
-        else :
-            ypos = ypos_in + self.segment_wid
-            ylen = self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        self.segment_wid ,
-                                        ylen ,
-                                        seg_color)
+        self._segment (SEG_UL, xpos_in, ypos_in, color_in)
     def UR_seg (self, xpos_in, ypos_in, color_in=None) :
-        xpos = xpos_in + self.segment_wid + self.h_segment_len
-        if self.bold :
-            ypos = ypos_in
-            ylen = self.segment_wid + self.v_segment_len + self.segment_wid
-        else :
-            ypos = ypos_in + self.segment_wid
-            ylen = self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        self.segment_wid ,
-                                        ylen ,
-                                        seg_color)
+        self._segment (SEG_UR, xpos_in, ypos_in, color_in)
     #-----------------------------------
     def MID_seg (self, xpos_in, ypos_in, color_in=None) :
-        if self.bold :
-            xpos = xpos_in
-            xlen = self.segment_wid + self.h_segment_len + self.segment_wid
-        else :
-            xpos = xpos_in + self.segment_wid
-            xlen = self.h_segment_len
-        ypos = ypos_in + self.segment_wid + self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        xlen ,
-                                        self.segment_wid ,
-                                        seg_color)
+        self._segment (SEG_MID, xpos_in, ypos_in, color_in)
     def LL_seg (self, xpos_in, ypos_in, color_in=None) :
-        xpos = xpos_in
-        if self.bold :
-            ypos = ypos_in + self.segment_wid + self.v_segment_len
-            ylen = self.segment_wid + self.v_segment_len + self.segment_wid
-        else :
-            ypos = ypos_in + self.segment_wid + self.v_segment_len + self.segment_wid
-            ylen = self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        self.segment_wid ,
-                                        ylen ,
-                                        seg_color)
+        self._segment (SEG_LL, xpos_in, ypos_in, color_in)
     def LR_seg (self, xpos_in, ypos_in, color_in=None) :
-        xpos = xpos_in + self.segment_wid + self.h_segment_len
-        if self.bold :
-            ypos = ypos_in + self.segment_wid + self.v_segment_len
-            ylen = self.segment_wid + self.v_segment_len + self.segment_wid
-        else :
-            ypos = ypos_in + self.segment_wid + self.v_segment_len + self.segment_wid
-            ylen = self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        self.segment_wid ,
-                                        ylen ,
-                                        seg_color)
+        self._segment (SEG_LR, xpos_in, ypos_in, color_in)
     #-----------------------------------
     def BOT_seg (self, xpos_in, ypos_in, color_in=None) :
-        if self.bold :
-            xpos = xpos_in
-            xlen = self.segment_wid + self.h_segment_len + self.segment_wid
-        else :
-            xpos = xpos_in + self.segment_wid
-            xlen = self.h_segment_len
-        ypos = ypos_in \
-                + self.segment_wid \
-                + self.v_segment_len \
-                + self.segment_wid \
-                + self.v_segment_len
-        if not color_in == None :
-            seg_color = color_in
-        else :
-            seg_color = self.color
-        self.pixel_display.fill_rect (xpos ,
-                                        ypos ,
-                                        xlen ,
-                                        self.segment_wid ,
-                                        seg_color)
-    #---------------------------------------------------------------------------------
-    def nine_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def eight_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def seven_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        #self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def six_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def five_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def four_seg (self, xpos, ypos) :
-        #self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def three_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def two_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        #self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #-----------------------------------------------
-    def one_seg (self, xpos, ypos) :
-        #self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        #self.MID_seg (xpos, ypos)
-        #self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def zero_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        #self.MID_seg (xpos,ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def a_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def b_seg (self, xpos, ypos) :
-        #self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def c_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        #self.MID_seg (xpos,ypos)
-        self.LL_seg (xpos, ypos)
-        #self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def d_seg (self, xpos, ypos) :
-        #self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos, ypos)
-        self.LL_seg (xpos, ypos)
-        self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def e_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos,ypos)
-        self.LL_seg (xpos, ypos)
-        #self.LR_seg (xpos, ypos)
-        self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def f_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        self.UL_seg (xpos, ypos)
-        #self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos,ypos)
-        self.LL_seg (xpos, ypos)
-        #self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-    #---------------------------------------------------------------------------------
-    def question_seg (self, xpos, ypos) :
-        self.TOP_seg (xpos, ypos)
-        #self.UL_seg (xpos, ypos)
-        self.UR_seg (xpos, ypos)
-        self.MID_seg (xpos,ypos)
-        self.LL_seg (xpos, ypos)
-        #self.LR_seg (xpos, ypos)
-        #self.BOT_seg (xpos, ypos)
-        return self.char_wid
-
-    #---------------------------------------------------------------------------------
-    def decimal_point_seg (self, xpos, ypos) :
-        self.pixel_display.fill_rect (xpos ,
-                            ypos + self.v_segment_len
-                                    + self.v_segment_len
-                                    + self.segment_wid
-                                    + self.segment_wid ,
-                            self.segment_wid ,
-                            self.segment_wid ,
-                            self.color)
-        return self.segment_wid + self.spacing
-    #---------------------------------------------------------------------------------
-    def colon_seg (self, xpos, ypos) :
-        self.decimal_point_seg (xpos, ypos)
-        self.pixel_display.fill_rect (xpos ,
-                            ypos + self.v_segment_len + self.segment_wid ,
-                            self.segment_wid ,
-                            self.segment_wid ,
-                            self.color)
-        return self.segment_wid + self.spacing
-    #---------------------------------------------------------------------------------
-    def minus_seg (self, xpos, ypos) :
-        self.pixel_display.fill_rect (xpos , # + self.segment_wid,
-                                        ypos + self.v_segment_len + self.segment_wid ,
-                                        self.sign_seg_len ,
-                                        self.segment_wid ,
-                                        self.color)
-        return self.sign_seg_len + self.spacing
-    #---------------------------------------------------------------------------------
-    def plus_seg (self, xpos, ypos) :
-        self.minus_seg (xpos, ypos)
-        vxpos = xpos + int (self.sign_seg_len / 2)
-        vxpos -= int (self.segment_wid / 2)
-        vypos = ypos + self.v_segment_len + self.segment_wid - int (self.sign_seg_len / 2) + 1
-        self.pixel_display.fill_rect (vxpos ,
-                                        vypos ,
-                                        self.segment_wid ,
-                                        self.sign_seg_len ,
-                                        self.color)
-        return self.sign_seg_len + self.spacing
-    #---------------------------------------------------------------------------------
-    def space_seg (self, xpos, ypos) :
-        return self.char_wid
+        self._segment (SEG_BOT, xpos_in, ypos_in, color_in)
 
     #---------------------------------------------------------------------------------
+    def get_parameters (self) :
+        # Current settings, can be passed back to set_parameters (**...)
+        return {
+            "v_segment_length" : self.v_segment_len ,
+            "h_segment_length" : self.h_segment_len ,
+            "segment_width" : self.segment_wid ,
+            "spacing" : self.spacing ,
+            "bold" : self.bold ,
+            "color" : self.color ,
+            "segments" : self.segments ,
+            "ghost_color" : self.ghost_color
+            }
     def get_character_width (self) :
         return self.char_wid
     def get_character_height (self) :
         return self.char_height
     #-----------------------------
+    def _cached_bitmap (self, char, rects) :
+        # (dx, dy, width, height, MONO_HLSB bytes, FrameBuffer over
+        # them or None in "bitmap" mode)
+        key = (char, self.cache_params, self.blit_mode)
+        bitmap = self.glyph_cache.get (key)
+        if bitmap == None :
+            x_min = min (rect[0] for rect in rects)
+            y_min = min (rect[1] for rect in rects)
+            x_max = max (rect[0] + rect[2] for rect in rects)
+            y_max = max (rect[1] + rect[3] for rect in rects)
+            buf = rasterize ([(dx - x_min, dy - y_min, xlen, ylen)
+                                for dx, dy, xlen, ylen in rects] ,
+                             x_max - x_min ,
+                             y_max - y_min)
+            fbuf = None
+            if not self.blit_mode == "bitmap" :
+                fbuf = framebuf.FrameBuffer (buf ,
+                                             x_max - x_min ,
+                                             y_max - y_min ,
+                                             framebuf.MONO_HLSB)
+            bitmap = (x_min, y_min, x_max - x_min, y_max - y_min, buf, fbuf)
+            self.glyph_cache.put (key, bitmap, len (buf))
+        return bitmap
+    def _blit_character (self, xpos, ypos, char, glyph) :
+        if glyph[1] :
+            dx, dy, xlen, ylen, buf, fbuf = self._cached_bitmap (char, glyph[1])
+            if self.blit_mode == "blit" :
+                #---- blit compares the key after the palette lookup, so
+                #     source 0 -> key, 1 -> self.color and key != color
+                key = 1 if self.color == 0 else 0
+                palette = self.palette
+                if palette == None :
+                    palette = framebuf.FrameBuffer (bytearray (4), 2, 1, framebuf.RGB565)
+                    palette.pixel (0, 0, key)
+                    palette.pixel (1, 0, self.color)
+                    self.palette = palette
+                self.pixel_display.blit (fbuf, xpos + dx, ypos + dy, key, palette)
+            elif self.blit_mode == "gfx_blit" :
+                self.pixel_display.bitmap (xpos + dx ,
+                                            ypos + dy ,
+                                            xlen ,
+                                            ylen ,
+                                            buf ,
+                                            self.color ,
+                                            fbuf=fbuf)
+            else :
+                self.pixel_display.bitmap (xpos + dx ,
+                                            ypos + dy ,
+                                            xlen ,
+                                            ylen ,
+                                            buf ,
+                                            self.color)
+            if not self.profiler == None :
+                self.profiler.bitmaps_drawn (1)
+        if not self.ghost_color == GHOST_OFF :
+            self._fill_ghost (xpos, ypos, glyph)
+        return glyph[0]
+    #-----------------------------
     def display_character (self, xpos, ypos, char) :
-        if char in self.segment_chars :
-            return self.segment_chars[char]["handler"] (xpos, ypos)
+        glyph = self.glyphs.get (char)
+        if glyph == None :
+            char = "?"
+            glyph = self.glyphs[char]
+        if not self.profiler == None :
+            self.profiler.glyphs_drawn (1)
+        if not self.blit_mode == None :
+            return self._blit_character (xpos, ypos, char, glyph)
+        if not self.profiler == None :
+            self.profiler.rects_filled (len (glyph[1]))
+        fill_rect = self.pixel_display.fill_rect
+        color = self.color
+        for dx, dy, xlen, ylen in glyph[1] :
+            fill_rect (xpos + dx, ypos + dy, xlen, ylen, color)
+        if not self.ghost_color == GHOST_OFF :
+            self._fill_ghost (xpos, ypos, glyph)
+        return glyph[0]
+    def _fill_ghost (self, xpos, ypos, glyph) :
+        fill_rect = self.pixel_display.fill_rect
+        color = self.ghost_color
+        for dx, dy, xlen, ylen in glyph[2] :
+            fill_rect (xpos + dx, ypos + dy, xlen, ylen, color)
+        if not self.profiler == None :
+            self.profiler.rects_filled (len (glyph[2]))
+    def display_string (self, xpos, ypos, chars, retained=False, background=0) :
+        if not self.profiler == None :
+            return self.profiler.time_string (self ,
+                                              xpos ,
+                                              ypos ,
+                                              chars ,
+                                              retained ,
+                                              background)
+        return self._draw_string (xpos, ypos, chars, retained, background)
+    def _draw_string (self, xpos, ypos, chars, retained, background) :
+        if retained :
+            return self._update_string (xpos, ypos, chars, background)
+        glyphs = self.glyphs
+        unknown = glyphs["?"]
+        x_display = xpos
+        if not self.blit_mode == None :
+            for char in chars :
+                glyph = glyphs.get (char)
+                if glyph == None :
+                    char = "?"
+                    glyph = unknown
+                x_display += self._blit_character (x_display, ypos, char, glyph)
+            return x_display
+        fill_rect = self.pixel_display.fill_rect
+        color = self.color
+        rects = 0                   # fill_rect calls, for the profiler
+        if not self.ghost_color == GHOST_OFF :
+            ghost_color = self.ghost_color
+            for char in chars :
+                glyph = glyphs.get (char, unknown)
+                for dx, dy, xlen, ylen in glyph[1] :
+                    fill_rect (x_display + dx, ypos + dy, xlen, ylen, color)
+                for dx, dy, xlen, ylen in glyph[2] :
+                    fill_rect (x_display + dx, ypos + dy, xlen, ylen, ghost_color)
+                rects += len (glyph[1]) + len (glyph[2])
+                x_display += glyph[0]
         else :
-            return self.question_seg (xpos, ypos)
-    def display_string (self, xpos, ypos, chars) :
+            for char in chars :
+                glyph = glyphs.get (char, unknown)
+                for dx, dy, xlen, ylen in glyph[1] :
+                    fill_rect (x_display + dx, ypos + dy, xlen, ylen, color)
+                rects += len (glyph[1])
+                x_display += glyph[0]
+        if not self.profiler == None :
+            self.profiler.rects_filled (rects)
+        return x_display
+
+    #---------------------------------------------------------------------------------
+    # measure_string (chars) - Width display_string would advance, the
+    #   last character's spacing included.  Results are memoized until
+    #   the parameters change (up to MEASURE_CACHE_SIZE strings).
+    # layout (chars, box, align="left") - (xpos, ypos) that places chars
+    #   in box (x, y, width, height), align "left", "center" or "right",
+    #   vertically centered.  The trailing spacing is not counted so
+    #   centered/right aligned text is flush with the box.
+    #------------------------------
+    def measure_string (self, chars) :
+        widths = self.string_widths
+        if widths == None or len (widths) >= MEASURE_CACHE_SIZE :
+            widths = self.string_widths = {}
+        width = widths.get (chars)
+        if width == None :
+            glyphs = self.glyphs
+            unknown = glyphs["?"]
+            width = 0
+            for char in chars :
+                width += glyphs.get (char, unknown)[0]
+            widths[chars] = width
+        return width
+    def layout (self, chars, box, align="left") :
+        box_x, box_y, box_width, box_height = box
+        width = self.measure_string (chars)
+        if chars :
+            width -= self.spacing
+        if align == "center" :
+            xpos = box_x + (box_width - width) // 2
+        elif align == "right" :
+            xpos = box_x + box_width - width
+        else :
+            xpos = box_x
+        ypos = box_y + (box_height - self.char_height + self.spacing) // 2
+        return xpos, ypos
+
+    #---------------------------------------------------------------------------------
+    # display_number (xpos, ypos, value, width, decimals=0, sign=False, pad=" ")
+    #   Right aligned number in a field of width digit cells, drawn
+    #   with integer arithmetic only (no string formatting).
+    #   decimals - digits after a decimal point (value may be a float)
+    #   sign - True adds a sign cell in front showing '+' or '-',
+    #          otherwise '-' takes the cell left of the first digit
+    #   pad - " " or "0" for unused cells on the left
+    #   Values that do not fit show '-' in every cell.
+    #   Returns the x after the field, which only depends on the
+    #   arguments, not on the value.
+    #------------------------------
+    def display_number (self, xpos, ypos, value, width, decimals=0, sign=False, pad=" ") :
+        scale = 10 ** decimals
+        if isinstance (value, int) :
+            number = abs (value) * scale
+        else :
+            number = int (abs (value) * scale + 0.5)
+        negative = value < 0 and number > 0
+        glyphs = self.glyphs
+        point_wid = glyphs["."][0]
+        sign_wid = glyphs["+"][0]
+        char_wid = self.char_wid
+        digit_glyphs = self.digit_glyphs
+        x_end = xpos + width * char_wid
+        if decimals :
+            x_end += point_wid
+        if sign :
+            x_end += sign_wid
+        minus = negative and not sign
+        #---- at least decimals + 1 digits are drawn ("0.5", "-0.5")
+        digits = max (number, 10 ** decimals)
+        overflow = digits >= 10 ** (width - 1 if minus else width) \
+                        or decimals >= width
+        x_display = x_end
+        for cell in range (width) :
+            if cell == decimals and decimals :
+                x_display -= point_wid
+                self._fill_glyph (x_display, ypos, glyphs["."])
+            x_display -= char_wid
+            if overflow :
+                self._fill_glyph (x_display, ypos, glyphs["-"])
+            elif number or cell <= decimals :
+                self._fill_glyph (x_display, ypos, digit_glyphs[number % 10])
+                number //= 10
+            elif minus and (not pad == "0" or cell == width - 1) :
+                self._fill_glyph (x_display, ypos, glyphs["-"])
+                minus = False
+            elif pad == "0" :
+                self._fill_glyph (x_display, ypos, digit_glyphs[0])
+            elif not self.ghost_color == GHOST_OFF :
+                self._fill_ghost (x_display, ypos, glyphs[" "])
+        if sign :
+            self._fill_glyph (x_display - sign_wid ,
+                              ypos ,
+                              glyphs["-" if negative else "+"])
+        return x_end
+    def _fill_glyph (self, xpos, ypos, glyph) :
+        fill_rect = self.pixel_display.fill_rect
+        color = self.color
+        for dx, dy, xlen, ylen in glyph[1] :
+            fill_rect (xpos + dx, ypos + dy, xlen, ylen, color)
+        if not self.profiler == None :
+            self.profiler.rects_filled (len (glyph[1]))
+        if not self.ghost_color == GHOST_OFF :
+            self._fill_ghost (xpos, ypos, glyph)
+
+    def string_rects (self, xpos, ypos, chars, ghost=False) :
+        # Rectangles (x, y, width, height) display_string would fill,
+        # and the x position after the last character.  ghost=True
+        # gives the ones filled with ghost_color instead.
+        glyphs = self.glyphs
+        unknown = glyphs["?"]
+        index = 2 if ghost else 1
+        rects = []
         x_display = xpos
         for char in chars :
-            x_display += self.display_character (x_display, ypos, char)
-        return x_display
+            glyph = glyphs.get (char, unknown)
+            for dx, dy, xlen, ylen in glyph[index] :
+                rects.append ((x_display + dx, ypos + dy, xlen, ylen))
+            x_display += glyph[0]
+        return rects, x_display
+
+    def display_many (self, items) :
+        # items: (xpos, ypos, chars) or (xpos, ypos, chars, parameters)
+        #   parameters is a set_parameters keyword dict for that string
+        #   only, the current parameters are restored afterwards.
+        # All rectangles are collected first, overlapping and abutting
+        # ones of the same color are merged, then they are filled
+        # (ghost segments first).  Returns the final x of each string.
+        saved = None
+        changed = False
+        ghost_runs = []             # [ghost_color, rects] in drawing order
+        runs = []                   # [color, rects] in drawing order
+        x_ends = []
+        for item in items :
+            if changed :
+                self.set_parameters (**saved)
+                changed = False
+            if len (item) > 3 and item[3] :
+                if saved == None :
+                    saved = self.get_parameters ()
+                self.set_parameters (**item[3])
+                changed = True
+            rects, x_end = self.string_rects (item[0], item[1], item[2])
+            x_ends.append (x_end)
+            if not runs or not runs[-1][0] == self.color :
+                runs.append ([self.color, []])
+            runs[-1][1].extend (rects)
+            if not self.ghost_color == GHOST_OFF :
+                if not ghost_runs or not ghost_runs[-1][0] == self.ghost_color :
+                    ghost_runs.append ([self.ghost_color, []])
+                ghost_runs[-1][1].extend (self.string_rects (item[0] ,
+                                                             item[1] ,
+                                                             item[2] ,
+                                                             ghost=True)[0])
+        if changed :
+            self.set_parameters (**saved)
+        fill_rect = self.pixel_display.fill_rect
+        filled = 0
+        for color, rects in ghost_runs + runs :
+            rects = coalesce_rects (rects)
+            for xpos, ypos, xlen, ylen in rects :
+                fill_rect (xpos, ypos, xlen, ylen, color)
+            filled += len (rects)
+        if not self.profiler == None :
+            self.profiler.rects_filled (filled)
+        return x_ends
+
+    #---------------------------------------------------------------------------------
+    # Retained mode (display_string (..., retained=True))
+    #   The segment masks drawn for each string position are remembered.
+    #   The next call at the same xpos, ypos clears only the segments that
+    #   went off (with background) and fills only the ones that came on,
+    #   then returns the dirty box (x, y, width, height) or None.
+    #   Call clear_retained () after clearing the display yourself.
+    #   set_retained records slots [(x, mask), ...] at xpos, ypos as
+    #   drawn with the current parameters, without drawing anything
+    #   (animate.SegmentAnimator after its last frame), get_retained
+    #   returns (slots, segment_rects, (color, ghost_color)) or None.
+    #   The dict is only made by the first retained call.
+    #------------------------------
+    def clear_retained (self) :
+        self.retained = None
+    def get_retained (self, xpos, ypos) :
+        if self.retained == None :
+            return None
+        return self.retained.get ((xpos, ypos))
+    def set_retained (self, xpos, ypos, slots) :
+        if self.retained == None :
+            self.retained = {}
+        self.retained[(xpos, ypos)] = (slots ,
+                                       self.segment_rects ,
+                                       (self.color, self.ghost_color))
+    def _update_string (self, xpos, ypos, chars, background) :
+        glyphs = self.glyphs
+        masks = self.segment_masks
+        slots = []
+        x_display = xpos
+        for char in chars :
+            mask = masks.get (char)
+            if mask == None :
+                char = "?"
+                mask = masks[char]
+            slots.append ((x_display, mask))
+            x_display += glyphs[char][0]
+        rects = self.segment_rects
+        ghost_color = self.ghost_color
+        old = self.get_retained (xpos, ypos)
+        self.set_retained (xpos, ypos, slots)
+        paints = []                 # (x, mask, rects, color) painted first
+        fills = []                  # (x, mask) to paint color
+        if old == None :
+            fresh = True
+        elif old[1] is rects and old[2] == (self.color, ghost_color) \
+                and [slot[0] for slot in old[0]] == [slot[0] for slot in slots] :
+            fresh = False
+            for index in range (len (slots)) :
+                x_slot, new_mask = slots[index]
+                self._slot_change (x_slot ,
+                                   old[0][index][1] ,
+                                   new_mask ,
+                                   background ,
+                                   paints ,
+                                   fills)
+        else :                      # layout changed, replace everything
+            fresh = True
+            old_cell = 0
+            if not old[2][1] == GHOST_OFF :
+                old_cell = _cell_bits (old[1])
+            for x_slot, mask in old[0] :
+                paints.append ((x_slot ,
+                                mask | _ghost_bits (mask, old_cell) ,
+                                old[1] ,
+                                background))
+        if fresh :
+            if not ghost_color == GHOST_OFF :
+                cell = _cell_bits (rects)
+                for x_slot, mask in slots :
+                    paints.append ((x_slot, _ghost_bits (mask, cell), rects, ghost_color))
+            for x_slot, mask in slots :
+                fills.append ((x_slot, mask))
+        return self._paint_slots (ypos, paints, fills)
+    def _slot_change (self, x_slot, old_mask, new_mask, background, paints, fills) :
+        # Paints and fills taking one cell from old_mask to new_mask.
+        # Segments going off become ghost_color in full width cells.
+        rects = self.segment_rects
+        ghost_color = self.ghost_color
+        if not ghost_color == GHOST_OFF \
+                and not _full_cell (old_mask) == _full_cell (new_mask) :
+            #---- cell with ghosts <-> narrow symbol, redraw the slot
+            cell = _cell_bits (rects)
+            paints.append ((x_slot ,
+                            old_mask | _ghost_bits (old_mask, cell) ,
+                            rects ,
+                            background))
+            paints.append ((x_slot, _ghost_bits (new_mask, cell), rects, ghost_color))
+            fills.append ((x_slot, new_mask))
+            return
+        off, on = self._mask_change (old_mask, new_mask)
+        if off :
+            if ghost_color == GHOST_OFF or not _full_cell (new_mask) :
+                paints.append ((x_slot, off, rects, background))
+            else :
+                paints.append ((x_slot, off, rects, ghost_color))
+        if on :
+            fills.append ((x_slot, on))
+    def _paint_slots (self, ypos, paints, fills) :
+        # Returns the dirty box (x, y, width, height) or None
+        box = [None]
+        for x_slot, mask, slot_rects, color in paints :
+            if mask :
+                self._fill_mask (x_slot, ypos, mask, slot_rects, color, box)
+        rects = self.segment_rects
+        for x_slot, mask in fills :
+            self._fill_mask (x_slot, ypos, mask, rects, self.color, box)
+        if box[0] == None :
+            return None
+        x_min, y_min, x_max, y_max = box[0]
+        return (x_min, y_min, x_max - x_min, y_max - y_min)
+    def _mask_change (self, old_mask, new_mask) :
+        # Segments to clear and to fill to go from old_mask to new_mask.
+        # Still lit segments sharing pixels with a cleared one are refilled.
+        off = old_mask & ~new_mask
+        on = new_mask & ~old_mask
+        if off :
+            touched = 0
+            for bit, overlap in self.segment_overlaps.items () :
+                if off & bit :
+                    touched |= overlap
+            on |= new_mask & old_mask & touched
+        return off, on
+    def update_mask (self, xpos, ypos, old_mask, new_mask, background=0) :
+        # Change one character cell from old_mask to new_mask segments
+        # (SEG_* bits) touching only the segments that differ.
+        # Returns the dirty box (x, y, width, height) or None.
+        paints = []
+        fills = []
+        self._slot_change (xpos, old_mask, new_mask, background, paints, fills)
+        return self._paint_slots (ypos, paints, fills)
+    def _fill_mask (self, xpos, ypos, mask, rects, color, box) :
+        # rects is the segment_rects the mask was drawn with
+        fill_rect = self.pixel_display.fill_rect
+        filled = 0
+        for bit, parts in rects.items () :
+            if not mask & bit :
+                continue
+            filled += len (parts)
+            for dx, dy, xlen, ylen in parts :
+                x_0 = xpos + dx
+                y_0 = ypos + dy
+                fill_rect (x_0, y_0, xlen, ylen, color)
+                if box[0] == None :
+                    box[0] = (x_0, y_0, x_0 + xlen, y_0 + ylen)
+                else :
+                    x_min, y_min, x_max, y_max = box[0]
+                    box[0] = (min (x_min, x_0) ,
+                              min (y_min, y_0) ,
+                              max (x_max, x_0 + xlen) ,
+                              max (y_max, y_0 + ylen))
+        if not self.profiler == None :
+            self.profiler.rects_filled (filled)
+
+# end OLED7Segment #
+
+def _segment_tables (segments) :
+    # (segment bits, character masks) for 7, 14 or 16 segments
+    if segments == 7 :
+        return SEGMENT_BITS, SEGMENT_MASKS
+    import segment16
+    return segment16.segment_tables (segments)
+
+def _full_cell (mask) :
+    # True for characters using the whole cell (not '.', ':', sign)
+    return not mask & (SEG_DP | SEG_COLON | SEG_SIGN_H)
+
+def _cell_bits (rects) :
+    # Segment bits of a character cell (no symbols) in segment_rects
+    cell = 0
+    for bit in rects :
+        cell |= bit
+    return cell & ~SYMBOL_BITS
+
+def _ghost_bits (mask, cell) :
+    # Unlit segments shown in ghost_color for a character's mask
+    if _full_cell (mask) :
+        return cell & ~mask
+    return 0
+
+def _cached_geometry (key, make) :
+    geometry = _geometry.get (key)
+    if geometry == None :
+        geometry = make ()
+        if len (_geometry) >= GEOMETRY_CACHE_SIZE :
+            _geometry.clear ()
+        _geometry[key] = geometry
+    return geometry
+
+def _font_geometry (font, ghost) :
+    # The _geometry tuple for a fontcompile.py module, glyphs with
+    # their ghost rectangles if ghost
+    masks = _segment_tables (font.SEGMENTS)[1]
+    parts = {}
+    overlaps = {}
+    for index in range (len (font.SEGMENT_BITS)) :
+        bit = font.SEGMENT_BITS[index]
+        parts[bit] = font.SEGMENT_RECTS[index]
+        overlaps[bit] = font.SEGMENT_OVERLAPS[index]
+    glyphs = {}
+    for index in range (len (font.CHARS)) :
+        glyph = font.GLYPH_INDEX[index]
+        if ghost :
+            glyphs[font.CHARS[index]] = (font.ADVANCES[glyph] ,
+                                         font.GLYPH_RECTS[glyph] ,
+                                         font.GHOST_RECTS[glyph])
+        else :
+            glyphs[font.CHARS[index]] = (font.ADVANCES[glyph], font.GLYPH_RECTS[glyph])
+    return (font.SEGMENT_BITS ,
+            masks ,
+            parts ,
+            overlaps ,
+            glyphs ,
+            tuple (glyphs[char] for char in "0123456789") ,
+            font.CHAR_WID ,
+            font.CHAR_HEIGHT ,
+            font.SIGN_SEG_LEN)
+
+def _ghost_glyphs (bits, masks, parts, glyphs) :
+    # (glyphs, digit_glyphs) with a third item per glyph, the unlit
+    # segments of full width characters cut around the lit ones
+    cell = _cell_bits (parts)
+    ghosts = {}
+    for char, glyph in glyphs.items () :
+        unlit = _ghost_bits (masks[char], cell)
+        ghosts[char] = (glyph[0] ,
+                        glyph[1] ,
+                        partition_rects ([rect
+                                            for bit in bits
+                                                if unlit & bit
+                                                    for rect in parts[bit]] ,
+                                         glyph[1]))
+    return ghosts, tuple (ghosts[char] for char in "0123456789")
+
+def _touching (rects, others) :
+    # True if any rectangle in rects shares pixels with one in others
+    for ax, ay, aw, ah in rects :
+        for bx, by, bw, bh in others :
+            if ax < bx + bw and bx < ax + aw \
+                    and ay < by + bh and by < ay + ah :
+                return True
+    return False
+
+#---------------------------------------------------------------------------------
+# Merge rectangles (x, y, width, height) that share a column span and
+# overlap/touch vertically, or share a row span and overlap/touch
+# horizontally.  Duplicates and rectangles covered this way disappear.
+#------------------------------
+def coalesce_rects (rects) :
+    rects = list (set (rects))
+    count = len (rects) + 1
+    while len (rects) < count :
+        count = len (rects)
+        #---- same x and width, stack vertically
+        rects.sort (key=lambda rect : (rect[0], rect[2], rect[1]))
+        merged = []
+        for rect in rects :
+            if merged :
+                last = merged[-1]
+                if last[0] == rect[0] and last[2] == rect[2] \
+                        and rect[1] <= last[1] + last[3] :
+                    bottom = max (last[1] + last[3], rect[1] + rect[3])
+                    merged[-1] = (last[0], last[1], last[2], bottom - last[1])
+                    continue
+            merged.append (rect)
+        #---- same y and height, join horizontally
+        merged.sort (key=lambda rect : (rect[1], rect[3], rect[0]))
+        rects = []
+        for rect in merged :
+            if rects :
+                last = rects[-1]
+                if last[1] == rect[1] and last[3] == rect[3] \
+                        and rect[0] <= last[0] + last[2] :
+                    right = max (last[0] + last[2], rect[0] + rect[2])
+                    rects[-1] = (last[0], last[1], right - last[0], last[3])
+                    continue
+            rects.append (rect)
+    return rects
 
-# end Simple7Segment #
+#---------------------------------------------------------------------------------
+# Split the union of rectangles into non-overlapping rectangles.
+# The area is cut into cells at every rectangle edge, then covered
+# cells are joined either row band first or column band first and
+# the partition with fewer rectangles is returned as a tuple.
+# Cells covered by a rectangle in exclude are left out.
+#------------------------------
+def partition_rects (rects, exclude=()) :
+    if len (rects) < 2 and not exclude :
+        return tuple (rects)
+    if not rects :
+        return ()
+    by_rows = _partition_bands (rects, exclude)
+    by_columns = [(y, x, ylen, xlen) for x, y, xlen, ylen
+                    in _partition_bands ([(y, x, ylen, xlen)
+                                            for x, y, xlen, ylen in rects] ,
+                                         [(y, x, ylen, xlen)
+                                            for x, y, xlen, ylen in exclude])]
+    if len (by_columns) < len (by_rows) :
+        return tuple (by_columns)
+    return tuple (by_rows)
 
+def _partition_bands (rects, exclude) :
+    edges = list (rects) + list (exclude)
+    xs = sorted (set ([rect[0] for rect in edges]
+                      + [rect[0] + rect[2] for rect in edges]))
+    ys = sorted (set ([rect[1] for rect in edges]
+                      + [rect[1] + rect[3] for rect in edges]))
+    result = []
+    open_runs = {}                  # (x start, x end) -> y start
+    for row in range (len (ys)) :
+        runs = []
+        if row < len (ys) - 1 :
+            y_0 = ys[row]
+            start = None
+            for col in range (len (xs)) :
+                covered = False
+                if col < len (xs) - 1 :
+                    x_0 = xs[col]
+                    for x, y, xlen, ylen in rects :
+                        if x <= x_0 < x + xlen and y <= y_0 < y + ylen :
+                            covered = True
+                            break
+                    for x, y, xlen, ylen in exclude :
+                        if x <= x_0 < x + xlen and y <= y_0 < y + ylen :
+                            covered = False
+                            break
+                if covered and start == None :
+                    start = xs[col]
+                elif not covered and not start == None :
+                    runs.append ((start, xs[col]))
+                    start = None
+        #---- close runs that do not continue into this band
+        for run in list (open_runs) :
+            if not run in runs :
+                y_start = open_runs.pop (run)
+                result.append ((run[0] ,
+                                y_start ,
+                                run[1] - run[0] ,
+                                ys[row] - y_start))
+        for run in runs :
+            if not run in open_runs :
+                open_runs[run] = ys[row]
+    return result
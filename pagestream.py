@@ -0,0 +1,99 @@
+##################################################################
+# pagestream.py - Render OLED7Segment text one SSD1306 page at a time
+#   For boards that cannot spare a framebuffer (1 KB for 128x64):
+#   a display list of strings is rendered into a single page buffer
+#   (8 rows, one byte per column, same layout as the SSD1306 and
+#   MonoCanvas) which is yielded for sending before the next page is
+#   drawn.  Peak memory is one page, and each page can go out on the
+#   bus while the next one is computed.  Every page walks the display
+#   list again and skips strings that do not reach it.
+#
+# Functions:
+#   pages (items, width=128, height=64, background=0)
+#     Generator yielding (page number, page buffer) top to bottom.
+#     items: [(seven_segment, xpos, ypos, chars), ...] drawn in order
+#     with each seven_segment's color (and ghost_color).  The same
+#     bytearray is reused, send it before asking for the next page.
+#   send_pages (display, items, background=0)
+#     Streams the pages to an SSD1306 style driver with write_cmd,
+#     write_data, width and height (the ssd1306 module's SSD1306_I2C
+#     or SSD1306_SPI, or a driver without a buffer offering the same).
+#
+# Typical use:
+# seven_segment = OLED7Segment (None)
+# seven_segment.set_parameters (digit_size="M")
+# send_pages (oled, [(seven_segment, 0, 0, "12:34"), (seven_segment, 0, 32, "-5.0")])
+#
+#################################################################
+
+from oled7segment import GHOST_OFF
+
+SET_COL_ADDR = 0x21
+SET_PAGE_ADDR = 0x22
+
+def pages (items, width=128, height=64, background=0) :
+    page_buffer = bytearray (width)
+    for page in range ((height + 7) // 8) :
+        y_0 = page * 8
+        y_1 = min (y_0 + 8, height)
+        blank = (1 << (y_1 - y_0)) - 1 if background else 0
+        for x in range (width) :
+            page_buffer[x] = blank
+        for seven_segment, xpos, ypos, chars in items :
+            if ypos < y_1 and ypos + seven_segment.char_height > y_0 :
+                _draw_page (page_buffer, y_0, y_1, seven_segment, xpos, ypos, chars)
+        yield page, page_buffer
+
+def _draw_page (page_buffer, y_0, y_1, seven_segment, xpos, ypos, chars) :
+    glyphs = seven_segment.glyphs
+    unknown = glyphs["?"]
+    color = seven_segment.color
+    ghost_color = seven_segment.ghost_color
+    width = len (page_buffer)
+    x_display = xpos
+    for char in chars :
+        if x_display >= width :
+            break
+        glyph = glyphs.get (char, unknown)
+        for dx, dy, xlen, ylen in glyph[1] :
+            _fill_page (page_buffer, y_0, y_1, x_display + dx, ypos + dy, xlen, ylen, color)
+        if not ghost_color == GHOST_OFF :
+            for dx, dy, xlen, ylen in glyph[2] :
+                _fill_page (page_buffer, y_0, y_1, x_display + dx, ypos + dy, xlen, ylen ,
+                            ghost_color)
+        x_display += glyph[0]
+
+def _fill_page (page_buffer, y_0, y_1, x, y, xlen, ylen, color) :
+    # The part of rectangle x, y, xlen, ylen in rows y_0 .. y_1 - 1
+    top = max (y, y_0) - y_0
+    bottom = min (y + ylen, y_1) - y_0
+    if top >= bottom :
+        return
+    x_end = min (x + xlen, len (page_buffer))
+    if x < 0 :
+        x = 0
+    mask = ((1 << bottom) - 1) & ~((1 << top) - 1)
+    if color :
+        for index in range (x, x_end) :
+            page_buffer[index] |= mask
+    else :
+        mask ^= 0xFF
+        for index in range (x, x_end) :
+            page_buffer[index] &= mask
+
+def send_pages (display, items, background=0) :
+    # Same addressing as ssd1306.SSD1306.show (), then one write per page
+    x_0 = 0
+    x_1 = display.width - 1
+    if not display.width == 128 :
+        col_offset = (128 - display.width) // 2
+        x_0 += col_offset
+        x_1 += col_offset
+    display.write_cmd (SET_COL_ADDR)
+    display.write_cmd (x_0)
+    display.write_cmd (x_1)
+    display.write_cmd (SET_PAGE_ADDR)
+    display.write_cmd (0)
+    display.write_cmd ((display.height + 7) // 8 - 1)
+    for page, page_buffer in pages (items, display.width, display.height, background) :
+        display.write_data (page_buffer)
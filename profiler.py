@@ -0,0 +1,171 @@
+##################################################################
+# profiler.py - Opt-in drawing counters and frame time histogram
+#   Nothing is counted until attach () is called, and detach ()
+#   puts everything back, so there is no cost when not profiling.
+#
+# Inputs (__init__ with default values):
+#   window=32 - Number of recent display_string durations kept
+#   buckets_us=BUCKETS_US - Histogram bucket upper limits (us)
+# Methods:
+#   attach (target) / detach (target)
+#     target is an OLED7Segment (glyphs, segment rectangles and glyph
+#     cache bitmaps actually drawn, ghost ones included, and
+#     display_string time) or a gfx.GFX (fill_rect, hline and vline
+#     calls into GFX, pixel function calls).  Pixels written are
+#     counted where drawing leaves GFX: the pixel function and native
+#     fill_rect/hline/vline.
+#   counters () - dict of all counts
+#   histogram () - [(bucket limit us, count), ...] of the last window
+#     display_string durations, the last limit is None (above all)
+#   reset ()
+#
+# Typical use:
+# profile = Profiler ()
+# profile.attach (graphic)
+# profile.attach (seven_segment)
+# ... draw some frames ...
+# print (profile.counters (), profile.histogram ())
+#
+#################################################################
+
+try :
+    from time import ticks_us, ticks_diff
+except ImportError :                # CPython
+    from time import perf_counter_ns
+    def ticks_us () :
+        return perf_counter_ns () // 1000
+    def ticks_diff (end, start) :
+        return end - start
+
+BUCKETS_US = (500, 1000, 2000, 4000, 8000, 16000, 33000)
+
+GFX_CALLS = ("fill_rect", "hline", "vline")
+
+class Profiler :
+    def __init__ (self, window=32, buckets_us=BUCKETS_US) :
+        self.window = window
+        self.buckets_us = buckets_us
+        self.saved = {}             # id (gfx) -> {name : original or None}
+        self.reset ()
+
+    def reset (self) :
+        self.counts = {
+            "strings" : 0 ,
+            "glyphs" : 0 ,
+            "segment_rects" : 0 ,
+            "bitmaps" : 0 ,
+            "fill_rect" : 0 ,
+            "hline" : 0 ,
+            "vline" : 0 ,
+            "pixel" : 0 ,
+            "pixels" : 0
+            }
+        self.durations = [0] * self.window
+        self.next_duration = 0
+        self.recorded = 0
+
+    #---------------------------------------------------------------------------------
+    def attach (self, target) :
+        if hasattr (target, "profiler") :           # OLED7Segment
+            target.profiler = self
+            return
+        if id (target) in self.saved :
+            return
+        saved = {}
+        #---- calls into GFX
+        for name in GFX_CALLS :
+            saved[name] = target.__dict__.get (name)
+            setattr (target ,
+                     name ,
+                     self._counter (name, getattr (target, name), False))
+        #---- pixels leaving GFX: pixel function and native functions
+        saved["_pixel"] = target._pixel
+        target._pixel = self._counter ("pixel", target._pixel, True)
+        for name in GFX_CALLS :
+            function = getattr (target, "_" + name)
+            if not function == None \
+                    and not getattr (function, "__self__", None) is target :
+                saved["_" + name] = function
+                setattr (target ,
+                         "_" + name ,
+                         self._counter (name, function, True))
+        self.saved[id (target)] = saved
+
+    def detach (self, target) :
+        if hasattr (target, "profiler") :
+            target.profiler = None
+            return
+        saved = self.saved.pop (id (target), None)
+        if saved == None :
+            return
+        for name, function in saved.items () :
+            if function == None :
+                delattr (target, name)          # back to the GFX method
+            else :
+                setattr (target, name, function)
+
+    def _counter (self, name, function, native) :
+        # native: count the pixels a function behind GFX writes,
+        # otherwise count calls into GFX
+        counts = self.counts
+        if name == "pixel" :
+            def counted (x, y, *args, **kwargs) :
+                counts["pixel"] += 1
+                counts["pixels"] += 1
+                return function (x, y, *args, **kwargs)
+        elif name == "fill_rect" :
+            def counted (x, y, width, height, *args, **kwargs) :
+                if native :
+                    counts["pixels"] += width * height
+                else :
+                    counts["fill_rect"] += 1
+                return function (x, y, width, height, *args, **kwargs)
+        else :
+            def counted (x, y, length, *args, **kwargs) :
+                if native :
+                    counts["pixels"] += length
+                else :
+                    counts[name] += 1
+                return function (x, y, length, *args, **kwargs)
+        return counted
+
+    #---------------------------------------------------------------------------------
+    # Called by OLED7Segment while attached
+    #------------------------------
+    def glyphs_drawn (self, glyphs) :
+        self.counts["glyphs"] += glyphs
+
+    def rects_filled (self, rects) :
+        self.counts["segment_rects"] += rects
+
+    def bitmaps_drawn (self, bitmaps) :
+        self.counts["bitmaps"] += bitmaps
+
+    def time_string (self, seven_segment, xpos, ypos, chars, retained, background) :
+        start = ticks_us ()
+        x_end = seven_segment._draw_string (xpos, ypos, chars, retained, background)
+        duration = ticks_diff (ticks_us (), start)
+        self.durations[self.next_duration] = duration
+        self.next_duration = (self.next_duration + 1) % self.window
+        self.recorded += 1
+        self.counts["strings"] += 1
+        self.glyphs_drawn (len (chars))
+        return x_end
+
+    #---------------------------------------------------------------------------------
+    def counters (self) :
+        return dict (self.counts)
+
+    def histogram (self) :
+        counts = [0] * (len (self.buckets_us) + 1)
+        for index in range (min (self.recorded, self.window)) :
+            duration = self.durations[index]
+            bucket = 0
+            while bucket < len (self.buckets_us) \
+                    and duration > self.buckets_us[bucket] :
+                bucket += 1
+            counts[bucket] += 1
+        limits = list (self.buckets_us) + [None]
+        return [(limits[index], counts[index]) for index in range (len (counts))]
+
+# end Profiler #
@@ -0,0 +1,108 @@
+##################################################################
+# scheduler.py - asyncio frame scheduler for OLED7Segment fields
+#   Producers (sensor tasks, the clock, ...) post "field now shows
+#   text" updates at any rate.  Only the latest text per field is
+#   kept, and one render task draws all changed fields (retained
+#   mode, so only changed segments are written) and calls show ()
+#   once per frame, at most fps frames per second.
+#
+# Inputs (__init__ with default values):
+#   display - Object with show () (e.g. the ssd1306 driver)
+#   fps=20 - Maximum frames per second
+#   background=0 - Color used to clear segments that turned off
+# Methods:
+#   add_field (name, seven_segment, xpos, ypos, text=None)
+#     text (optional) is drawn in the next frame like a post
+#   post (name, text) - Latest text for a field (not a coroutine)
+#   render () - Draw pending updates now, returns True if any
+#   run () - Coroutine, render/show loop until stop ()
+#   stop ()
+#   frames, updates, coalesced - counters
+#
+# Typical use:
+# scheduler = FrameScheduler (oled, fps=10)
+# scheduler.add_field ("time", seven_segment, 0, 0)
+# async def clock () :
+#     while True :
+#         scheduler.post ("time", time_string ())
+#         await asyncio.sleep (1)
+# asyncio.create_task (clock ())
+# asyncio.run (scheduler.run ())
+#
+#################################################################
+
+try :
+    import uasyncio as asyncio
+except ImportError :
+    import asyncio
+
+try :
+    from time import ticks_ms, ticks_diff
+except ImportError :                # CPython
+    from time import monotonic
+    def ticks_ms () :
+        return int (monotonic () * 1000)
+    def ticks_diff (end, start) :
+        return end - start
+
+class FrameScheduler :
+    def __init__ (self, display, fps=20, background=0) :
+        self.display = display
+        self.frame_ms = 1000 // fps
+        self.background = background
+        self.fields = {}            # name -> [seven_segment, x, y, pending]
+        self.order = []             # field names in drawing order
+        self.changed = asyncio.Event ()
+        self.running = False
+        self.frames = 0
+        self.updates = 0
+        self.coalesced = 0
+
+    def add_field (self, name, seven_segment, xpos, ypos, text=None) :
+        self.fields[name] = [seven_segment, xpos, ypos, text]
+        self.order.append (name)
+        if not text == None :
+            self.changed.set ()
+
+    def post (self, name, text) :
+        field = self.fields[name]
+        if not field[3] == None :
+            self.coalesced += 1     # previous update was never drawn
+        field[3] = text
+        self.updates += 1
+        self.changed.set ()
+
+    def render (self) :
+        drawn = False
+        for name in self.order :
+            seven_segment, xpos, ypos, text = self.fields[name]
+            if text == None :
+                continue
+            self.fields[name][3] = None
+            if not seven_segment.display_string (xpos ,
+                                                  ypos ,
+                                                  text ,
+                                                  retained=True ,
+                                                  background=self.background) == None :
+                drawn = True
+        return drawn
+
+    async def run (self) :
+        self.running = True
+        while self.running :
+            await self.changed.wait ()
+            self.changed.clear ()
+            start = ticks_ms ()
+            if self.render () :
+                self.display.show ()
+                self.frames += 1
+            #---- updates posted while waiting are drawn in the next frame
+            wait_ms = self.frame_ms - ticks_diff (ticks_ms (), start)
+            if wait_ms > 0 :
+                await asyncio.sleep (wait_ms / 1000)
+
+    def stop (self) :
+        self.running = False
+        self.changed.set ()
+
+# end FrameScheduler #
@@ -0,0 +1,192 @@
+##################################################################
+# segment16.py - 14 and 16 segment alphanumeric tables for OLED7Segment
+#   Loaded by OLED7Segment only when segments=14 or segments=16 is
+#   set, so 7 segment users never pay for the larger alphabet.
+#   Characters are segment masks like SEGMENT_MASKS; the geometry is
+#   computed once per parameter set and drawn through the same cached
+#   rectangle lists as the 7 segment digits.
+#
+# Segments (16 segment layout, bold=False):
+#    TOP TOP_R          14 segments: TOP and BOT are not split
+#  U \    |    / U
+#  L  \   |   /  R      Diagonals: DIAG_UL, DIAG_UR, DIAG_LL, DIAG_LR
+#  x   \  |  /   x      Center bars: CENTER_U, CENTER_L
+#    MID    MID_R
+#  L   /  |  \   L
+#  L  /   |   \  R
+#  x /    |    \ x
+#    BOT BOT_R
+#
+# Diagonals are drawn as staircases of rectangles, they look best
+# with h_segment_length 8 or more (digit_size "M" and "L").
+#
+#################################################################
+
+from oled7segment import SEG_TOP, SEG_UL, SEG_UR, SEG_MID, SEG_LL, SEG_LR, SEG_BOT, \
+                         SEG_DP, SEG_COLON
+
+SEG_TOP_R = 0x00800     # right half of the top bar (16 segments)
+SEG_MID_R = 0x01000     # right half of the middle bar, SEG_MID is the left
+SEG_BOT_R = 0x02000     # right half of the bottom bar (16 segments)
+SEG_DIAG_UL = 0x04000
+SEG_CENTER_U = 0x08000
+SEG_DIAG_UR = 0x10000
+SEG_DIAG_LL = 0x20000
+SEG_CENTER_L = 0x40000
+SEG_DIAG_LR = 0x80000
+
+SEGMENT14_BITS = (SEG_TOP, SEG_UL, SEG_UR, SEG_MID, SEG_MID_R, SEG_LL, SEG_LR, SEG_BOT,
+                  SEG_DIAG_UL, SEG_CENTER_U, SEG_DIAG_UR ,
+                  SEG_DIAG_LL, SEG_CENTER_L, SEG_DIAG_LR ,
+                  SEG_DP, SEG_COLON)
+SEGMENT16_BITS = SEGMENT14_BITS + (SEG_TOP_R, SEG_BOT_R)
+
+_TOP = SEG_TOP | SEG_TOP_R
+_MID = SEG_MID | SEG_MID_R
+_BOT = SEG_BOT | SEG_BOT_R
+_LEFT = SEG_UL | SEG_LL
+_RIGHT = SEG_UR | SEG_LR
+_CENTER = SEG_CENTER_U | SEG_CENTER_L
+
+#----------------------------------------------------------------------------------
+# Character -> segment mask (16 segments, 14 segment masks are derived)
+#------------------------------
+SEGMENT16_MASKS = {
+    "0" : _TOP | _LEFT | _RIGHT | _BOT | SEG_DIAG_UR | SEG_DIAG_LL ,
+    "1" : _RIGHT | SEG_DIAG_UR ,
+    "2" : _TOP | SEG_UR | _MID | SEG_LL | _BOT ,
+    "3" : _TOP | _RIGHT | SEG_MID_R | _BOT ,
+    "4" : SEG_UL | _MID | _RIGHT ,
+    "5" : _TOP | SEG_UL | _MID | SEG_LR | _BOT ,
+    "6" : _TOP | _LEFT | _MID | SEG_LR | _BOT ,
+    "7" : _TOP | _RIGHT ,
+    "8" : _TOP | _LEFT | _RIGHT | _MID | _BOT ,
+    "9" : _TOP | SEG_UL | _RIGHT | _MID | _BOT ,
+    "A" : _TOP | _LEFT | _RIGHT | _MID ,
+    "B" : _TOP | _RIGHT | SEG_MID_R | _BOT | _CENTER ,
+    "C" : _TOP | _LEFT | _BOT ,
+    "D" : _TOP | _RIGHT | _BOT | _CENTER ,
+    "E" : _TOP | _LEFT | SEG_MID | _BOT ,
+    "F" : _TOP | _LEFT | SEG_MID ,
+    "G" : _TOP | _LEFT | SEG_LR | SEG_MID_R | _BOT ,
+    "H" : _LEFT | _RIGHT | _MID ,
+    "I" : _TOP | _CENTER | _BOT ,
+    "J" : _RIGHT | SEG_LL | _BOT ,
+    "K" : _LEFT | SEG_MID | SEG_DIAG_UR | SEG_DIAG_LR ,
+    "L" : _LEFT | _BOT ,
+    "M" : _LEFT | _RIGHT | SEG_DIAG_UL | SEG_DIAG_UR ,
+    "N" : _LEFT | _RIGHT | SEG_DIAG_UL | SEG_DIAG_LR ,
+    "O" : _TOP | _LEFT | _RIGHT | _BOT ,
+    "P" : _TOP | _LEFT | SEG_UR | _MID ,
+    "Q" : _TOP | _LEFT | _RIGHT | _BOT | SEG_DIAG_LR ,
+    "R" : _TOP | _LEFT | SEG_UR | _MID | SEG_DIAG_LR ,
+    "S" : _TOP | SEG_UL | _MID | SEG_LR | _BOT ,
+    "T" : _TOP | _CENTER ,
+    "U" : _LEFT | _RIGHT | _BOT ,
+    "V" : _LEFT | SEG_DIAG_LL | SEG_DIAG_UR ,
+    "W" : _LEFT | _RIGHT | SEG_DIAG_LL | SEG_DIAG_LR ,
+    "X" : SEG_DIAG_UL | SEG_DIAG_UR | SEG_DIAG_LL | SEG_DIAG_LR ,
+    "Y" : SEG_DIAG_UL | SEG_DIAG_UR | SEG_CENTER_L ,
+    "Z" : _TOP | SEG_DIAG_UR | SEG_DIAG_LL | _BOT ,
+    "?" : _TOP | SEG_UR | SEG_MID_R | SEG_CENTER_L ,
+    " " : 0 ,
+    "." : SEG_DP ,
+    "," : SEG_DP ,
+    ":" : SEG_DP | SEG_COLON ,
+    "-" : _MID ,
+    "+" : _MID | _CENTER ,
+    "=" : _MID | _BOT ,
+    "_" : _BOT ,
+    "*" : _MID | _CENTER | SEG_DIAG_UL | SEG_DIAG_UR | SEG_DIAG_LL | SEG_DIAG_LR ,
+    "/" : SEG_DIAG_UR | SEG_DIAG_LL ,
+    "\\" : SEG_DIAG_UL | SEG_DIAG_LR ,
+    "|" : _CENTER ,
+    "'" : SEG_CENTER_U ,
+    "\"" : SEG_UL | SEG_CENTER_U ,
+    "(" : SEG_DIAG_UR | SEG_DIAG_LR ,
+    ")" : SEG_DIAG_UL | SEG_DIAG_LL ,
+    "<" : SEG_DIAG_UR | SEG_DIAG_LR ,
+    ">" : SEG_DIAG_UL | SEG_DIAG_LL ,
+    "[" : SEG_TOP_R | _CENTER | SEG_BOT_R ,
+    "]" : SEG_TOP | _CENTER | SEG_BOT ,
+    "$" : _TOP | SEG_UL | _MID | SEG_LR | _BOT | _CENTER ,
+    "%" : SEG_TOP | SEG_UL | SEG_CENTER_U | _MID | SEG_DIAG_UR | SEG_DIAG_LL \
+                | SEG_CENTER_L | SEG_LR | SEG_BOT_R ,
+    "°" : SEG_TOP | SEG_UL | SEG_CENTER_U | SEG_MID       # degree sign
+    }
+for _char in "ABCDEFGHIJKLMNOPQRSTUVWXYZ" :
+    SEGMENT16_MASKS[_char.lower ()] = SEGMENT16_MASKS[_char]
+
+#---- 14 segments: either half of the top/bottom bar lights the whole bar
+SEGMENT14_MASKS = {}
+for _char, _mask in SEGMENT16_MASKS.items () :
+    if _mask & _TOP :
+        _mask = (_mask & ~SEG_TOP_R) | SEG_TOP
+    if _mask & _BOT :
+        _mask = (_mask & ~SEG_BOT_R) | SEG_BOT
+    SEGMENT14_MASKS[_char] = _mask
+
+def segment_tables (segments) :
+    # (segment bits, character masks) for 14 or 16 segments
+    if segments == 16 :
+        return SEGMENT16_BITS, SEGMENT16_MASKS
+    return SEGMENT14_BITS, SEGMENT14_MASKS
+
+#----------------------------------------------------------------------------------
+# segment_rects (segments, rects, wid, v_len, h_len)
+#   rects holds the 7 segment rectangles (dx, dy, width, height) for
+#   the same parameters.  Returns segment bit -> tuple of rectangles:
+#   the middle (and for 16 segments the top/bottom) bar is split at
+#   the center, the center bars run along the outer vertical ones and
+#   each diagonal is a staircase filling its quarter of the cell.
+#------------------------------
+def segment_rects (segments, rects, wid, v_len, h_len) :
+    full_wid = wid + h_len + wid
+    split = full_wid // 2
+    center = (full_wid - wid) // 2
+    mid = wid + v_len
+    bot = mid + wid + v_len
+    split_bits = ((SEG_MID, SEG_MID_R) ,)
+    if segments == 16 :
+        split_bits += ((SEG_TOP, SEG_TOP_R), (SEG_BOT, SEG_BOT_R))
+    parts = {}
+    for bit in (SEG_TOP, SEG_UL, SEG_UR, SEG_LL, SEG_LR, SEG_BOT) :
+        parts[bit] = (rects[bit] ,)
+    for left, right in split_bits :
+        dx, dy, xlen, ylen = rects[left]
+        parts[left] = ((dx, dy, split - dx, ylen) ,)
+        parts[right] = ((split, dy, dx + xlen - split, ylen) ,)
+    dx, dy, xlen, ylen = rects[SEG_UL]
+    parts[SEG_CENTER_U] = ((center, dy, wid, ylen) ,)
+    dx, dy, xlen, ylen = rects[SEG_LL]
+    parts[SEG_CENTER_L] = ((center, dy, wid, ylen) ,)
+    #---- diagonals between the outer bars, the center bar and the bars
+    thickness = max (1, (wid + 1) // 2)
+    left_x = wid
+    right_x = center + wid
+    box_wid = center - wid
+    parts[SEG_DIAG_UL] = _staircase (left_x, wid, box_wid, v_len, thickness, True)
+    parts[SEG_DIAG_UR] = _staircase (right_x, wid, box_wid, v_len, thickness, False)
+    parts[SEG_DIAG_LL] = _staircase (left_x, mid + wid, box_wid, v_len, thickness, False)
+    parts[SEG_DIAG_LR] = _staircase (right_x, mid + wid, box_wid, v_len, thickness, True)
+    return parts
+
+def _staircase (x_0, y_0, width, height, thickness, falling) :
+    # Rows of thickness pixels along the diagonal of the box, rows
+    # in the same column merged.  falling=True runs from the top
+    # left corner to the bottom right one.
+    if width < 1 or height < 1 :
+        return ()
+    thickness = min (thickness, width)
+    steps = []
+    for row in range (height) :
+        left = ((2 * row + 1) * width - thickness * height) // (2 * height)
+        left = max (0, min (left, width - thickness))
+        if not falling :
+            left = width - thickness - left
+        if steps and steps[-1][0] == x_0 + left :
+            x, y, xlen, ylen = steps[-1]
+            steps[-1] = (x, y, xlen, ylen + 1)
+        else :
+            steps.append ((x_0 + left, y_0 + row, thickness, 1))
+    return tuple (steps)